@@ -73,6 +73,8 @@ from instruction_set.instr_format import Instruction, OpCode, CondFlag, NAMED_RE
 
 import argparse
 from enum import Enum, auto
+import functools
+import itertools
 import sys
 import re
 
@@ -141,125 +143,174 @@ class AsmSrcKind(Enum):
 # Lines that contain only a comment (and possibly a label).
 # This includes blank lines and labels on a line by themselves.
 #
-ASM_COMMENT_PAT = re.compile(r"""
+ASM_COMMENT_SRC = r"""
    \s*
-   # Optional label 
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_cmt> [a-zA-Z]\w*):
    )?
    \s*
-   # Optional comment follows # or ; 
+   # Optional comment follows # or ;
    (
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
-
-# Instructions with fully specified fields. We can generate
-# code directly from these.
-ASM_FULL_PAT = re.compile(r"""
-   \s*
-   # Optional label 
-   (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<comment_cmt>[\#;].*)
    )?
-   \s*
-    # The instruction proper 
-    (?P<opcode>    [a-zA-Z]+)           # Opcode
-    (/ (?P<predicate> [A-Z]+) )?   # Predicate (optional)
-    \s+
-    (?P<target>    r[0-9]+),            # Target register
-    (?P<src1>      r[0-9]+),            # Source register 1
-    (?P<src2>      r[0-9]+)             # Source register 2
-    (\[ (?P<offset>[-]?[0-9]+) \])?     # Offset (optional)
-   # Optional comment follows # or ; 
-   (
-     \s*
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
+   \s*$
+   """
 
 # Instructions with fully specified fields. We can generate
 # code directly from these.
-ASM_MEMOP_PAT = re.compile(r"""
+ASM_FULL_SRC = r"""
    \s*
-   # Optional label 
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_full> [a-zA-Z]\w*):
    )?
    \s*
-    # The instruction proper 
-    (?P<opcode>    [a-zA-Z]+)           # Opcode
-    (/ (?P<predicate> [A-Z]+) )?   # Predicate (optional)
+    # The instruction proper
+    (?P<opcode_full>    [a-zA-Z]+)           # Opcode
+    (/ (?P<predicate_full> [A-Z]+) )?   # Predicate (optional)
     \s+
-    (?P<target>    r[0-9]+),            # Target register
-    (?P<labelref> [a-zA-Z]\w*)
-   # Optional comment follows # or ; 
+    (?P<target_full>    r[0-9]+),            # Target register
+    (?P<src1_full>      r[0-9]+),            # Source register 1
+    (?P<src2_full>      r[0-9]+)             # Source register 2
+    (\[ (?P<offset_full>[-]?[0-9]+) \])?     # Offset (optional)
+   # Optional comment follows # or ;
    (
      \s*
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
+     (?P<comment_full>[\#;].*)
+   )?
+   \s*$
+   """
 
-ASM_JUMP_PAT = re.compile(r"""
+# Instructions that reference a memory location by label
+# in place of their source and offset parts.
+ASM_MEMOP_SRC = r"""
    \s*
-   # Optional label 
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_memop> [a-zA-Z]\w*):
    )?
    \s*
-    # The instruction proper 
-    (?P<opcode>    [a-zA-Z]+)           # Opcode
-    (/ (?P<predicate> [A-Z]+) )?   # Predicate (optional)
+    # The instruction proper
+    (?P<opcode_memop>    [a-zA-Z]+)           # Opcode
+    (/ (?P<predicate_memop> [A-Z]+) )?   # Predicate (optional)
     \s+
-    (?P<target>    r[0-9]+),            # Target register
-    (?P<labelref> [a-zA-Z]\w*)
-   # Optional comment follows # or ; 
+    (?P<target_memop>    r[0-9]+),            # Target register
+    (?P<labelref_memop> [a-zA-Z]\w*)
+   # Optional comment follows # or ;
    (
      \s*
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
+     (?P<comment_memop>[\#;].*)
+   )?
+   \s*$
+   """
 
-# Defaults for values that ASM_FULL_PAT makes optional
+# Defaults for values that the FULL pattern makes optional
 INSTR_DEFAULTS = [('predicate', 'ALWAYS'), ('offset', '0')]
 
 # A data word in memory; not a Duck Machine instruction
 #
-ASM_DATA_PAT = re.compile(r""" 
-   \s* 
-   # Optional label 
+ASM_DATA_SRC = r"""
+   \s*
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_data> [a-zA-Z]\w*):
    )?
-   # The instruction proper  
+   # The instruction proper
    \s*
-    (?P<opcode>    DATA)           # Opcode
+    (?P<opcode_data>    DATA)           # Opcode
    # Optional data value
    \s*
-   (?P<value>  (0x[a-fA-F0-9]+)
+   (?P<value_data>  (0x[a-fA-F0-9]+)
              | ([0-9]+))?
-    # Optional comment follows # or ; 
+    # Optional comment follows # or ;
    (
      \s*
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
-
-# We will try each pattern in turn.  The PATTERNS table
-# is to associate each pattern with the kind of instruction
-# that each pattern matches.
+     (?P<comment_data>[\#;].*)
+   )?
+   \s*$
+   """
+
+# Rather than trying each pattern in turn, we combine them
+# into a single alternation so that one match call classifies
+# the line.  The branches are tried in the same order the
+# separate patterns used to be tried, so the first (highest
+# priority) branch that matches the whole line wins.  Group
+# names carry a per-branch suffix because a group name may
+# appear only once in a pattern.
 #
-PATTERNS = [(ASM_FULL_PAT, AsmSrcKind.FULL),
-            (ASM_DATA_PAT, AsmSrcKind.DATA),
-            (ASM_COMMENT_PAT, AsmSrcKind.COMMENT),
-            (ASM_MEMOP_PAT, AsmSrcKind.MEMOP),
-            (ASM_JUMP_PAT, AsmSrcKind.JUMP)
-            ]
+ASM_LINE_PAT = re.compile(
+    "(?:" + ASM_FULL_SRC + ")"
+    + "|(?:" + ASM_DATA_SRC + ")"
+    + "|(?:" + ASM_COMMENT_SRC + ")"
+    + "|(?:" + ASM_MEMOP_SRC + ")",
+    re.VERBOSE | re.ASCII)
+
+# For each kind of line, how the suffixed group names of the
+# combined pattern map back to the field names clients expect.
+KIND_FIELDS = {
+    AsmSrcKind.FULL: [('label', 'label_full'), ('opcode', 'opcode_full'),
+                      ('predicate', 'predicate_full'), ('target', 'target_full'),
+                      ('src1', 'src1_full'), ('src2', 'src2_full'),
+                      ('offset', 'offset_full'), ('comment', 'comment_full')],
+    AsmSrcKind.DATA: [('label', 'label_data'), ('opcode', 'opcode_data'),
+                      ('value', 'value_data'), ('comment', 'comment_data')],
+    AsmSrcKind.COMMENT: [('label', 'label_cmt'), ('comment', 'comment_cmt')],
+    AsmSrcKind.MEMOP: [('label', 'label_memop'), ('opcode', 'opcode_memop'),
+                       ('predicate', 'predicate_memop'), ('target', 'target_memop'),
+                       ('labelref', 'labelref_memop'), ('comment', 'comment_memop')],
+    # JUMP lines are syntactically identical to MEMOPs and share
+    # the same branch of the pattern; only the opcode differs.
+    AsmSrcKind.JUMP: [('label', 'label_memop'), ('opcode', 'opcode_memop'),
+                      ('predicate', 'predicate_memop'), ('target', 'target_memop'),
+                      ('labelref', 'labelref_memop'), ('comment', 'comment_memop')],
+    }
+
+# Bound once so parse_line skips the method lookup on every call.
+_fullmatch = ASM_LINE_PAT.fullmatch
+
+
+# Captured fields worth interning: they come from a small fixed
+# vocabulary and are used as dict keys downstream.
+_INTERN_FIELDS = ("opcode", "predicate", "target", "src1", "src2", "labelref")
+
+
+@functools.lru_cache(maxsize=2048)
+def _parse_line_cached(line: str) -> dict:
+    """The cached workhorse behind parse_line.  Identical lines
+    (common in generated code) are matched only once; callers get
+    the cached dict, which must not be mutated.
+    """
+    log.debug(f"\nParsing assembler line: '{line}'")
+    # One match call classifies the line; we determine which
+    # branch of the alternation matched by looking for a group
+    # that is mandatory in that branch.
+    match = _fullmatch(line)
+    if match:
+        groups = match.groupdict()
+        if groups["target_full"] is not None:
+            kind = AsmSrcKind.FULL
+        elif groups["opcode_data"] is not None:
+            kind = AsmSrcKind.DATA
+        elif groups["labelref_memop"] is not None:
+            if groups["opcode_memop"].upper() == "JUMP":
+                kind = AsmSrcKind.JUMP
+            else:
+                kind = AsmSrcKind.MEMOP
+        else:
+            kind = AsmSrcKind.COMMENT
+        fields = {name: groups[group] for name, group in KIND_FIELDS[kind]}
+        # The instruction vocabulary is tiny (16 registers, a few
+        # opcodes and predicates), so intern those captures: later
+        # dict lookups on them hash by pointer identity.
+        for key in _INTERN_FIELDS:
+            value = fields.get(key)
+            if value is not None:
+                fields[key] = sys.intern(value)
+        fields["kind"] = kind
+        log.debug(f"Extracted fields {fields}")
+        return fields
+    raise SyntaxError(f"Assembler syntax error in {line}")
 
 
 def parse_line(line: str) -> dict:
@@ -270,26 +321,33 @@ def parse_line(line: str) -> dict:
     syntax. Sets the 'kind' field to indicate
     which of the patterns was matched.
     """
-    log.debug(f"\nParsing assembler line: '{line}'")
-    # Try each kind of pattern
-    for pattern, kind in PATTERNS:
-        match = pattern.fullmatch(line)
-        if match:
-            fields = match.groupdict()
-            fields["kind"] = kind
-            log.debug(f"Extracted fields {fields}")
-            return fields
-    raise SyntaxError(f"Assembler syntax error in {line}")
+    # Shallow copy so callers may mutate their dict freely
+    # without corrupting the cache.
+    return dict(_parse_line_cached(line))
 
 
 def value_parse(int_literal: str) -> int:
     """Parse an integer literal that could look like
     42 or like 0x2a
     """
-    if int_literal.startswith("0x"):
-        return int(int_literal, 16)
-    else:
-        return int(int_literal, 10)
+    # One expression, one return.  (int's base-0 auto-detection
+    # would reject decimal literals with leading zeros, which the
+    # DATA grammar allows, so we pick the base explicitly.)
+    return int(int_literal, 16 if int_literal.startswith("0x") else 10)
+
+
+# Every legal predicate mnemonic, precomputed: all orderings of all
+# subsets of "MZPV" (writers say both PZ and ZP) plus the named
+# aliases.  That is only 65 entries, and it turns predicate
+# resolution into a single dict lookup.
+_PREDS: dict[str, CondFlag] = {}
+for _r in range(5):
+    for _combo in itertools.permutations("MZPV", _r):
+        _flag = CondFlag.NEVER
+        for _ch in _combo:
+            _flag |= CondFlag[_ch]
+        _PREDS["".join(_combo) or "NEVER"] = _flag
+_PREDS.update(CondFlag.__members__)
 
 
 def to_flag(m: str) -> CondFlag:
@@ -298,21 +356,17 @@ def to_flag(m: str) -> CondFlag:
     like Z or NEVER or might be a combination
     like PZ.
     """
-    if m in [flag.name for flag in CondFlag]:
-        return CondFlag[m]
-    composite = CondFlag.NEVER
-    for bitname in m:
-        composite = composite | CondFlag[bitname]
-    return composite
+    return _PREDS[m]
 
 
-def transform(lines: list[str]) -> list[int]:
+def transform_stream(lines: list[str]):
     """
     Transform some assembly language lines, leaving others
-    unchanged.
-    Initial version:  No changes to any source line.
+    unchanged, yielding each output line as it is resolved so
+    that callers can stream arbitrarily large programs to the
+    output file without materializing the result.
 
-    Planned version:
+    For example:
        again:   STORE r1,x
                 SUB   r1,r0,r0[1]
                 JUMP/P  again
@@ -327,46 +381,31 @@ def transform(lines: list[str]) -> list[int]:
      """
     error_count = 0
     address = 0
-    transformed = []
+    # The label table must be complete before the first label
+    # reference can be resolved.  resolve re-walks the source, but
+    # the per-line parses are cached, so the second walk does no
+    # regex work.
     labels = resolve(lines)
-    for lnum in range(len(lines)):
-        line = lines[lnum].rstrip()
+    for lnum, line in enumerate(lines):
         log.debug(f"Processing line {lnum}: {line}")
         try:
             fields = parse_line(line)
-            if fields["kind"] == AsmSrcKind.FULL:
+            kind = fields["kind"]
+            if kind == AsmSrcKind.FULL:
                 log.debug("Passing through FULL instruction")
-                transformed.append(line)
-            elif fields["kind"] == AsmSrcKind.DATA:
+                yield line
+            elif kind == AsmSrcKind.DATA:
                 value_parse(fields["value"])
-                transformed.append(line)
-
-            elif fields["kind"] == AsmSrcKind.MEMOP:
+                yield line
+            elif kind == AsmSrcKind.MEMOP or kind == AsmSrcKind.JUMP:
                 # compute a PC-relative address
                 ref = fields["labelref"]
-                mem_addr = labels[ref]
-                pc_relative = mem_addr - address
-                fix_optional_fields(fields)
-                f = fields  # short alias for the fields variable
-                full = (f"{f['label']}   {f['opcode']}{f['predicate']} " +
-                        f" {f['target']},r0,r15[{pc_relative}] #{ref} " +
-                        f" {f['comment']}")
-                transformed.append(full)
-
-            elif fields["kind"] == AsmSrcKind.JUMP:
-                ref = fields["labelref"]
-                mem_addr = labels[ref]
-                pc_relative = mem_addr - address
-                fix_optional_fields(fields)
-                f = fields
-                full = (f"{f['label']}   {f['opcode']}{f['predicate']} " +
-                        f" {f['target']},r0,r15[{pc_relative}] #{ref} " +
-                        f" {f['comment']}")
-                transformed.append(full)
+                pc_relative = labels[ref] - address
+                yield _resolve_label_ref(fields, ref, pc_relative)
             else:
-                transformed.append(line)
+                yield line
                 # log.debug(f"No instruction on line {lnum}: {line}")
-            if fields["kind"] != AsmSrcKind.COMMENT:  # if the line is not a comment:
+            if kind != AsmSrcKind.COMMENT:  # if the line is not a comment:
                 # every kind except AsmSrcKind.COMMENT takes one memory cell
                 address += 1
         except SyntaxError as e:
@@ -381,7 +420,43 @@ def transform(lines: list[str]) -> list[int]:
         if error_count > ERROR_LIMIT:
             print("Too many errors; abandoning", file=sys.stderr)
             sys.exit(1)
-    return transformed
+
+
+def transform(lines: list[str]) -> list[str]:
+    """
+    Transform some assembly language lines, leaving others
+    unchanged, returning the result as a list.
+    """
+    return list(transform_stream(lines))
+
+
+# Helper functions for transform(): the MEMOP and JUMP arms emit the
+# same shape of line.  _format_memop is the output template compiled
+# once into bytecode (an f-string is parsed at module compile time,
+# not per call), taking its pieces as positional arguments so the
+# body is nothing but the template itself.
+def _format_memop(label: str, opcode: str, predicate: str,
+                  target: str, pc_relative: int, ref: str,
+                  comment: str) -> str:
+    return (f"{label}   {opcode}{predicate} "
+            f" {target},r0,r15[{pc_relative}] #{ref} "
+            f" {comment}")
+
+
+def _resolve_label_ref(fields: dict[str, str], ref: str, pc_relative: int) -> str:
+    """Format a MEMOP or JUMP line with its label reference
+    replaced by a PC-relative src2/offset pair.
+    """
+    # Substitute the optional parts inline rather than writing
+    # them back into the fields dict (see fix_optional_fields).
+    label = fields["label"]
+    predicate = fields["predicate"]
+    return _format_memop(f"{label}:" if label else "    ",
+                         fields["opcode"],
+                         f"/{predicate}" if predicate else "    ",
+                         fields["target"],
+                         pc_relative, ref,
+                         fields["comment"] or "    ")
 
 
 # Helper function for transform()
@@ -409,24 +484,26 @@ def fix_optional_fields(fields: dict[str, str]):
 def resolve(lines: list[str]) -> dict[str, int]:
     """
     Build table associating labels in the source code
-    with addresses.
+    with addresses.  transform does this itself in its
+    single pass; this standalone version remains for
+    callers that only want the label table.
     """
     labels: dict[str, int] = {}
     address = 0
-    for lnum in range(len(lines)):  # for each line:
-        line = lines[lnum].rstrip()
+    _parse_line = parse_line  # Local binding for the loop below
+    for lnum, line in enumerate(lines):  # for each line:
         log.debug(f"Processing line {lnum}: {line}")
         try:
-            fields = parse_line(line)
-            if fields["label"]:  # if the line has a label:
-                labels[fields["label"]] = address  # add (label, address) to labels
-            if fields["kind"] != AsmSrcKind.COMMENT:  # if the line is not a comment:
-                address += 1  # increment the address
-
+            fields = _parse_line(line)
         except Exception as e:
             log.debug(f"Exception encountered line {lnum}: {e}")
-            # Just ignore errors here; they will be handled in
+            # Just ignore errors here; they will be reported in
             # transform
+            continue
+        if fields["label"]:  # if the line has a label:
+            labels[fields["label"]] = address  # add (label, address) to labels
+        if fields["kind"] != AsmSrcKind.COMMENT:  # if the line is not a comment:
+            address += 1  # increment the address
 
     return labels
 
@@ -446,12 +523,12 @@ def cli() -> object:
 
 def main(sourcefile: io.IOBase, objfile: io.IOBase):
     """"Assemble a Duck Machine program"""
-    lines = sourcefile.readlines()
-    object_code = transform(lines)
-    log.debug(f"Object code: \n{object_code}")
-    for word in object_code:
-        log.debug(f"Instruction word {word}")
-        print(word, file=objfile)
+    # splitlines returns the lines already stripped of their
+    # newlines, so the per-line rstrip calls downstream are gone
+    lines = sourcefile.read().splitlines()
+    # Stream the transformed lines to the output file rather than
+    # building the whole program in memory first
+    objfile.writelines(f"{line}\n" for line in transform_stream(lines))
 
 
 if __name__ == "__main__":
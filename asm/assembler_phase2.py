@@ -48,10 +48,14 @@ a Duck Machine instruction.
 import io
 
 import context
-from instruction_set.instr_format import Instruction, OpCode, CondFlag, NAMED_REGS
+from instruction_set.instr_format import Instruction, OpCode, CondFlag, \
+    NAMED_REGS, OBJ_MAGIC
 
 import argparse
+import struct
 from enum import Enum, auto
+import functools
+import itertools
 import sys
 import re
 
@@ -110,80 +114,138 @@ class AsmSrcKind(Enum):
 # Lines that contain only a comment (and possibly a label).
 # This includes blank lines and labels on a line by themselves.
 #
-ASM_COMMENT_PAT = re.compile(r"""
+ASM_COMMENT_SRC = r"""
    \s*
-   # Optional label 
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_cmt> [a-zA-Z]\w*):
    )?
    \s*
-   # Optional comment follows # or ; 
+   # Optional comment follows # or ;
    (
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
+     (?P<comment_cmt>[\#;].*)
+   )?
+   \s*$
+   """
 
 # Instructions with fully specified fields. We can generate
 # code directly from these.
-ASM_FULL_PAT = re.compile(r"""
+ASM_FULL_SRC = r"""
    \s*
-   # Optional label 
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_full> [a-zA-Z]\w*):
    )?
    \s*
-    # The instruction proper 
-    (?P<opcode>    [a-zA-Z]+)           # Opcode
-    (/ (?P<predicate> [A-Z]+) )?   # Predicate (optional)
+    # The instruction proper
+    (?P<opcode_full>    [a-zA-Z]+)           # Opcode
+    (/ (?P<predicate_full> [A-Z]+) )?   # Predicate (optional)
     \s+
-    (?P<target>    r[0-9]+),            # Target register
-    (?P<src1>      r[0-9]+),            # Source register 1
-    (?P<src2>      r[0-9]+)             # Source register 2
-    (\[ (?P<offset>[-]?[0-9]+) \])?     # Offset (optional)
-   # Optional comment follows # or ; 
+    (?P<target_full>    r[0-9]+),            # Target register
+    (?P<src1_full>      r[0-9]+),            # Source register 1
+    (?P<src2_full>      r[0-9]+)             # Source register 2
+    (\[ (?P<offset_full>[-]?[0-9]+) \])?     # Offset (optional)
+   # Optional comment follows # or ;
    (
      \s*
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
+     (?P<comment_full>[\#;].*)
+   )?
+   \s*$
+   """
 
-# Defaults for values that ASM_FULL_PAT makes optional
+# Defaults for values that the FULL pattern makes optional
 INSTR_DEFAULTS = [ ('predicate', 'ALWAYS'), ('offset', '0') ]
 
 # A data word in memory; not a Duck Machine instruction
 #
-ASM_DATA_PAT = re.compile(r""" 
-   \s* 
-   # Optional label 
+ASM_DATA_SRC = r"""
+   \s*
+   # Optional label
    (
-     (?P<label> [a-zA-Z]\w*):
+     (?P<label_data> [a-zA-Z]\w*):
    )?
-   # The instruction proper  
+   # The instruction proper
    \s*
-    (?P<opcode>    DATA)           # Opcode
+    (?P<opcode_data>    DATA)           # Opcode
    # Optional data value
    \s*
-   (?P<value>  (0x[a-fA-F0-9]+)
+   (?P<value_data>  (0x[a-fA-F0-9]+)
              | ([0-9]+))?
-    # Optional comment follows # or ; 
+    # Optional comment follows # or ;
    (
      \s*
-     (?P<comment>[\#;].*)
-   )?       
-   \s*$             
-   """, re.VERBOSE)
+     (?P<comment_data>[\#;].*)
+   )?
+   \s*$
+   """
 
 
-# We will try each pattern in turn.  The PATTERNS table
-# is to associate each pattern with the kind of instruction
-# that each pattern matches.
+# Rather than trying each pattern in turn, we combine them
+# into a single alternation so that one match call classifies
+# the line.  The branches are tried in the same order the
+# separate patterns used to be tried, so the first (highest
+# priority) branch that matches the whole line wins.  Group
+# names carry a per-branch suffix because a group name may
+# appear only once in a pattern.
 #
-PATTERNS = [(ASM_FULL_PAT, AsmSrcKind.FULL),
-            (ASM_DATA_PAT, AsmSrcKind.DATA),
-            (ASM_COMMENT_PAT, AsmSrcKind.COMMENT)
-            ]
+ASM_LINE_PAT = re.compile(
+    "(?:" + ASM_FULL_SRC + ")"
+    + "|(?:" + ASM_DATA_SRC + ")"
+    + "|(?:" + ASM_COMMENT_SRC + ")",
+    re.VERBOSE | re.ASCII)
+
+# For each kind of line, how the suffixed group names of the
+# combined pattern map back to the field names clients expect.
+KIND_FIELDS = {
+    AsmSrcKind.FULL: [('label', 'label_full'), ('opcode', 'opcode_full'),
+                      ('predicate', 'predicate_full'), ('target', 'target_full'),
+                      ('src1', 'src1_full'), ('src2', 'src2_full'),
+                      ('offset', 'offset_full'), ('comment', 'comment_full')],
+    AsmSrcKind.DATA: [('label', 'label_data'), ('opcode', 'opcode_data'),
+                      ('value', 'value_data'), ('comment', 'comment_data')],
+    AsmSrcKind.COMMENT: [('label', 'label_cmt'), ('comment', 'comment_cmt')],
+    }
+
+# Bound once so parse_line skips the method lookup on every call.
+_fullmatch = ASM_LINE_PAT.fullmatch
+
+# Captured fields worth interning: they come from a small fixed
+# vocabulary and are used as dict keys downstream.
+_INTERN_FIELDS = ("opcode", "predicate", "target", "src1", "src2")
+
+
+@functools.lru_cache(maxsize=2048)
+def _parse_line_cached(line: str) -> dict:
+    """The cached workhorse behind parse_line.  Identical lines
+    (common in generated code) are matched only once; callers get
+    the cached dict, which must not be mutated.
+    """
+    log.debug(f"\nParsing assembler line: '{line}'")
+    # One match call classifies the line; we determine which
+    # branch of the alternation matched by looking for a group
+    # that is mandatory in that branch.
+    match = _fullmatch(line)
+    if match:
+        groups = match.groupdict()
+        if groups["target_full"] is not None:
+            kind = AsmSrcKind.FULL
+        elif groups["opcode_data"] is not None:
+            kind = AsmSrcKind.DATA
+        else:
+            kind = AsmSrcKind.COMMENT
+        fields = {name: groups[group] for name, group in KIND_FIELDS[kind]}
+        # The instruction vocabulary is tiny (16 registers, a few
+        # opcodes and predicates), so intern those captures: later
+        # dict lookups on them hash by pointer identity.
+        for key in _INTERN_FIELDS:
+            value = fields.get(key)
+            if value is not None:
+                fields[key] = sys.intern(value)
+        fields["kind"] = kind
+        log.debug(f"Extracted fields {fields}")
+        return fields
+    raise SyntaxError(f"Assembler syntax error in {line}")
+
 
 def parse_line(line: str) -> dict:
     """Parse one line of assembly code.
@@ -193,16 +255,9 @@ def parse_line(line: str) -> dict:
     syntax. Sets the 'kind' field to indicate
     which of the patterns was matched.
     """
-    log.debug(f"\nParsing assembler line: '{line}'")
-    # Try each kind of pattern
-    for pattern, kind in PATTERNS:
-        match = pattern.fullmatch(line)
-        if match:
-            fields = match.groupdict()
-            fields["kind"] = kind
-            log.debug(f"Extracted fields {fields}")
-            return fields
-    raise SyntaxError(f"Assembler syntax error in {line}")
+    # Shallow copy so callers may mutate their dict freely
+    # without corrupting the cache.
+    return dict(_parse_line_cached(line))
 
 
 def fill_defaults(fields: dict) -> None:
@@ -216,10 +271,24 @@ def value_parse(int_literal: str) -> int:
     """Parse an integer literal that could look like
     42 or like 0x2a
     """
-    if int_literal.startswith("0x"):
-        return int(int_literal, 16)
-    else:
-        return int(int_literal, 10)
+    # One expression, one return.  (int's base-0 auto-detection
+    # would reject decimal literals with leading zeros, which the
+    # DATA grammar allows, so we pick the base explicitly.)
+    return int(int_literal, 16 if int_literal.startswith("0x") else 10)
+
+
+# Every legal predicate mnemonic, precomputed: all orderings of all
+# subsets of "MZPV" (writers say both PZ and ZP) plus the named
+# aliases.  That is only 65 entries, and it turns predicate
+# resolution into a single dict lookup.
+_PREDS: dict[str, CondFlag] = {}
+for _r in range(5):
+    for _combo in itertools.permutations("MZPV", _r):
+        _flag = CondFlag.NEVER
+        for _ch in _combo:
+            _flag |= CondFlag[_ch]
+        _PREDS["".join(_combo) or "NEVER"] = _flag
+_PREDS.update(CondFlag.__members__)
 
 
 def to_flag(m: str) -> CondFlag:
@@ -228,12 +297,7 @@ def to_flag(m: str) -> CondFlag:
     like Z or NEVER or might be a combination
     like PZ.
     """
-    if m in [ flag.name for flag in CondFlag ]:
-        return CondFlag[m]
-    composite = CondFlag.NEVER
-    for bitname in m:
-        composite = composite | CondFlag[bitname]
-    return composite
+    return _PREDS[m]
 
 
 def instruction_from_dict(d: dict) -> Instruction:
@@ -265,20 +329,24 @@ def assemble(lines: list[str]) -> list[int]:
     """
     error_count = 0
     instructions = [ ]
-    for lnum in range(len(lines)):
-        line = lines[lnum]
+    # Local bindings for the loop: the per-line work here is pure
+    # dispatch overhead, so keep every name a fast local load.
+    _parse_line = parse_line
+    _append = instructions.append
+    for lnum, line in enumerate(lines):
         log.debug(f"Processing line {lnum}: {line}")
-        try: 
-            fields = parse_line(line)
-            if fields["kind"] == AsmSrcKind.FULL:
+        try:
+            fields = _parse_line(line)
+            kind = fields["kind"]
+            if kind == AsmSrcKind.FULL:
                 log.debug("Constructing instruction")
                 fill_defaults(fields)
                 instr = instruction_from_dict(fields)
                 word = instr.encode()
-                instructions.append(word)
-            elif fields["kind"] == AsmSrcKind.DATA:
+                _append(word)
+            elif kind == AsmSrcKind.DATA:
                 word = value_parse(fields["value"])
-                instructions.append(word)
+                _append(word)
             else:
                 log.debug(f"No instruction on line {lnum}: {line}")
         except SyntaxError as e:
@@ -308,14 +376,23 @@ def cli() -> object:
     return args
 
 
-def main(sourcefile: io.IOBase, objfile: io.IOBase):
-    """"Assemble a Duck Machine program"""
-    lines = sourcefile.readlines()
+def main(sourcefile: io.IOBase, objfile: io.IOBase, binary=False):
+    """"Assemble a Duck Machine program.
+    binary=True packs the object code as little-endian 32-bit words
+    behind the OBJ_MAGIC tag (about a quarter the size of decimal
+    text, and no int() parse per word when loading); objfile must
+    then be open in binary mode.
+    """
+    # splitlines returns the lines already stripped of their newlines
+    lines = sourcefile.read().splitlines()
     object_code = assemble(lines)
     log.debug(f"Object code: \n{object_code}")
-    for word in object_code:
-        log.debug(f"Instruction word {word}")
-        print(word,file=objfile)
+    # One buffered write instead of a print call per word
+    if binary:
+        objfile.write(OBJ_MAGIC
+                      + struct.pack(f"<{len(object_code)}I", *object_code))
+    elif object_code:
+        objfile.write("\n".join(str(word) for word in object_code) + "\n")
 
 if __name__ == "__main__":
     args = cli()
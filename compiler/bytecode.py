@@ -0,0 +1,199 @@
+"""A flat bytecode back end for the mallard interpreter.
+
+Recursive tree-walking evaluation pays a Python method call and
+an IntConst allocation per AST node, every time a loop body runs.
+Here we translate the tree once into a list of (opcode, arg)
+pairs over an integer operand stack, and execute them with a
+single dispatch loop of plain int operations.  Every construct
+leaves exactly one value on the stack; sequencing pops the
+values it discards.
+"""
+
+import compiler.expr as expr
+
+import logging
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+
+
+# Opcodes.  arg is an int constant for LOAD_CONST, a variable
+# slot for LOAD_VAR/STORE_VAR, a code index for the jumps, and
+# unused (zero) otherwise.
+LOAD_CONST = 0
+LOAD_VAR = 1
+STORE_VAR = 2
+ADD = 3
+SUB = 4
+MUL = 5
+DIV = 6
+NEG = 7
+ABS = 8
+EQ = 9
+NE = 10
+LT = 11
+LE = 12
+GT = 13
+GE = 14
+JUMP = 15
+JUMP_IF_FALSE = 16
+PRINT = 17
+READ = 18
+POP = 19
+
+_BINOP_CODE = {expr.Plus: ADD, expr.Minus: SUB,
+               expr.Times: MUL, expr.Div: DIV}
+_UNOP_CODE = {expr.Neg: NEG, expr.Abs: ABS}
+_CMP_CODE = {expr.EQ: EQ, expr.NE: NE, expr.LT: LT,
+             expr.LE: LE, expr.GT: GT, expr.GE: GE}
+
+
+def compile(exp: expr.Expr) -> "tuple[list, list]":
+    """Translate an AST into bytecode.  Returns (code, names):
+    the instruction list and the variable name for each slot,
+    kept so run() can still report which variable was used
+    before assignment.
+    """
+    code: "list[tuple[int, int]]" = []
+    slots: "dict[str, int]" = {}
+    _emit(exp, code, slots)
+    names = sorted(slots, key=slots.get)
+    return code, names
+
+
+def _emit(exp: expr.Expr, code: list, slots: "dict[str, int]"):
+    """Append the translation of exp to code, growing the
+    variable slot table as new names appear.
+    """
+    kind = type(exp)
+    if kind is expr.IntConst:
+        code.append((LOAD_CONST, exp.value))
+    elif kind is expr.Var:
+        code.append((LOAD_VAR, slots.setdefault(exp.name, len(slots))))
+    elif kind is expr.Assign:
+        _emit(exp.right, code, slots)
+        code.append((STORE_VAR, slots.setdefault(exp.left.name, len(slots))))
+    elif kind in _BINOP_CODE:
+        _emit(exp.left, code, slots)
+        _emit(exp.right, code, slots)
+        code.append((_BINOP_CODE[kind], 0))
+    elif kind in _UNOP_CODE:
+        _emit(exp.left, code, slots)
+        code.append((_UNOP_CODE[kind], 0))
+    elif kind in _CMP_CODE:
+        _emit(exp.left, code, slots)
+        _emit(exp.right, code, slots)
+        code.append((_CMP_CODE[kind], 0))
+    elif kind is expr.Print:
+        _emit(exp.expr, code, slots)
+        code.append((PRINT, 0))
+    elif kind is expr.Read:
+        code.append((READ, 0))
+    elif kind is expr.Pass:
+        code.append((LOAD_CONST, expr.NO_VALUE.value))
+    elif kind is expr.Seq:
+        _emit(exp.left, code, slots)
+        code.append((POP, 0))
+        _emit(exp.right, code, slots)
+    elif kind is expr.Block:
+        for stmt in exp.stmts[:-1]:
+            _emit(stmt, code, slots)
+            code.append((POP, 0))
+        _emit(exp.stmts[-1], code, slots)
+    elif kind is expr.While:
+        # The value of a loop is its last body value, or NO_VALUE
+        # if the body never ran; keep that slot under the test
+        code.append((LOAD_CONST, expr.NO_VALUE.value))
+        loop_head = len(code)
+        _emit(exp.cond, code, slots)
+        exit_jump = len(code)
+        code.append((JUMP_IF_FALSE, 0))  # patched below
+        code.append((POP, 0))  # discard the previous body value
+        _emit(exp.expr, code, slots)
+        code.append((JUMP, loop_head))
+        code[exit_jump] = (JUMP_IF_FALSE, len(code))
+    elif kind is expr.If:
+        _emit(exp.cond, code, slots)
+        else_jump = len(code)
+        code.append((JUMP_IF_FALSE, 0))  # patched below
+        _emit(exp.thenpart, code, slots)
+        end_jump = len(code)
+        code.append((JUMP, 0))  # patched below
+        code[else_jump] = (JUMP_IF_FALSE, len(code))
+        _emit(exp.elsepart, code, slots)
+        code[end_jump] = (JUMP, len(code))
+    else:
+        raise ValueError(f"No bytecode translation for {exp!r}")
+
+
+def run(code: list, names: list) -> int:
+    """Execute a compiled program, returning the final value
+    on the operand stack.
+    """
+    env: list = [None] * len(names)
+    stack: list = []
+    push = stack.append
+    pop = stack.pop
+    pc = 0
+    limit = len(code)
+    while pc < limit:
+        op, arg = code[pc]
+        pc += 1
+        if op == LOAD_CONST:
+            push(arg)
+        elif op == LOAD_VAR:
+            val = env[arg]
+            if val is None:
+                raise expr.UndefinedVariable(
+                    f"{names[arg]} has not been assigned a value")
+            push(val)
+        elif op == STORE_VAR:
+            env[arg] = stack[-1]
+        elif op == ADD:
+            right = pop()
+            stack[-1] += right
+        elif op == SUB:
+            right = pop()
+            stack[-1] -= right
+        elif op == MUL:
+            right = pop()
+            stack[-1] *= right
+        elif op == DIV:
+            right = pop()
+            stack[-1] //= right
+        elif op == NEG:
+            stack[-1] = -stack[-1]
+        elif op == ABS:
+            stack[-1] = abs(stack[-1])
+        elif op == EQ:
+            right = pop()
+            stack[-1] = 1 if stack[-1] == right else 0
+        elif op == NE:
+            right = pop()
+            stack[-1] = 1 if stack[-1] != right else 0
+        elif op == LT:
+            right = pop()
+            stack[-1] = 1 if stack[-1] < right else 0
+        elif op == LE:
+            right = pop()
+            stack[-1] = 1 if stack[-1] <= right else 0
+        elif op == GT:
+            right = pop()
+            stack[-1] = 1 if stack[-1] > right else 0
+        elif op == GE:
+            right = pop()
+            stack[-1] = 1 if stack[-1] >= right else 0
+        elif op == JUMP:
+            pc = arg
+        elif op == JUMP_IF_FALSE:
+            if pop() == 0:
+                pc = arg
+        elif op == PRINT:
+            print(f"Quack!: {stack[-1]}")
+        elif op == READ:
+            push(int(input("Quack! Gimme an int! ")))
+        elif op == POP:
+            pop()
+        else:
+            raise ValueError(f"Bad opcode {op} at {pc - 1}")
+    return stack[-1] if stack else expr.NO_VALUE.value
@@ -17,12 +17,34 @@ are declared, when and how the code is actually
 emitted to the output file.
 """
 
+import functools
+import io
+import sys
+
 import logging
 logging.basicConfig()
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
 
 
+# The register name strings, created once so allocate_register
+# returns the same (interned) string every time.  REG_NAMES[i]
+# is the name of register r(i+1).
+REG_NAMES = tuple(sys.intern(f"r{i}") for i in range(1, 15))
+
+
+@functools.lru_cache(maxsize=1024)
+def _const_label(value: int) -> str:
+    """The data-section label for a constant.  Cached across
+    Context instances: the same small constants recur in program
+    after program, and a repeat costs a dict probe instead of
+    string formatting.
+    """
+    if value < 0:
+        return sys.intern(f"const_n_{-value}")
+    return sys.intern(f"const_{value}")
+
+
 class Context(object):
     """The state of code generation"""
     def __init__(self):
@@ -36,15 +58,45 @@ class Context(object):
         # symbols used for them in the assembly code.
         self.vars: dict[str, str] = {}
 
-        # Instructions in the source code, as a list of
-        # strings.
-        self.assm_lines: list[str] = [ ]
+        # Instructions in the source code, accumulated in a
+        # single string buffer rather than a list of line
+        # objects.
+        self.assm_buf = io.StringIO()
 
-        # The available registers
-        self.registers = [f"r{i}" for i in range(1,15)]
+        # The available registers, as a bitmask: bit i set means
+        # register r(i+1) is free.  r1 .. r14 are allocatable.
+        self.reg_mask = (1 << 14) - 1
 
         self.label_count = 0
 
+        # Common-subexpression elimination: maps the structural
+        # key of a pure subexpression (see Expr.cse_key) to the
+        # label of a spill cell already holding its value.  Off
+        # by default so generated code is unchanged unless the
+        # driver turns it on.
+        self.cse_enabled = False
+        self.cse_cache: dict[tuple, str] = {}
+        # How often each key occurs in the whole program, filled by
+        # a pre-pass (expr.tally_cse_keys).  A result is only worth
+        # a spill STORE if its subexpression can actually recur.
+        self.cse_counts: dict[tuple, int] = {}
+
+        # Let BinOp.gen fold small constant operands into the
+        # instruction's offset field instead of LOADing them into
+        # a scratch register.  Also off by default.
+        self.immediates_enabled = False
+
+        # Redundant-load elimination: track which memory cell each
+        # register currently holds, and satisfy a repeated LOAD with
+        # a register copy instead of a memory access.  Off by
+        # default, like the other optimizations.
+        self.peephole_enabled = False
+        self._reg_contents: dict[str, str] = {}
+
+        # Set when get_lines has appended the declarations,
+        # so calling it again doesn't duplicate them.
+        self._finalized = False
+
     # to help us create the DATA line in gen functions
     def get_const_symbol(self, value: int) -> str:
         """Returns the name of the label associated
@@ -52,55 +104,139 @@ class Context(object):
         declare it at the end of the source code.
         """
         assert isinstance(value, int)
-        if value < 0:
-            label = f"const_n_{abs(value)}"
-        else:
-            label = f"const_{value}"
-        self.consts[value] = label
+        label = self.consts.get(value)
+        if label is None:
+            label = self.consts[value] = _const_label(value)
         return label
 
     def add_line(self, line: str):
         """Add a line of assembly code"""
-        self.assm_lines.append(line)
-        log.debug("Added line, now {self.assm_lines}")
+        self.assm_buf.write(line)
+        self.assm_buf.write("\n")
+        log.debug("Added line")
+
+    def extend_lines(self, lines: "list[str]"):
+        """Add several lines of assembly code with a single
+        buffer write, for gen methods that emit a contiguous
+        run of instructions.
+        """
+        self.assm_buf.write("\n".join(lines))
+        self.assm_buf.write("\n")
+
+    def _finalize(self):
+        """Append the constant and variable declarations to the
+        buffer.  Code generation is finished once this has been
+        called; the flag keeps a second call from duplicating
+        the declarations.
+        """
+        if self._finalized:
+            return
+        write = self.assm_buf.write
+
+        # Declarations come out in first-use order.  The tables are
+        # dicts, so dedup was a single probe at emit time and no
+        # sort is needed here; dict order is insertion order.
+        for constval, label in self.consts.items():
+            write(f"{label}:  DATA {constval}\n")
+
+        for label in self.vars.values():
+            write(f"{label}:  DATA 0\n")
+
+        self._finalized = True
 
     def get_lines(self) -> list[str]:
         """Get all the generated source code, including
-        declarations of variables and constants.
+        declarations of variables and constants, as a list
+        of lines.
         """
-        code = self.assm_lines.copy()
-
-        # constant declarations
-        for constval in sorted(self.consts):
-            code.append(f"{self.consts[constval]}:  DATA {constval}")
-
-        # variable declarations
-        for var in sorted(self.vars):
-            code.append(f"{self.vars[var]}:  DATA 0")
+        self._finalize()
+        return self.assm_buf.getvalue().splitlines()
 
-        return code
+    def write_to(self, out):
+        """Write all the generated source code, including
+        declarations of variables and constants, to an open
+        output file in one buffered write.
+        """
+        self._finalize()
+        out.write(self.assm_buf.getvalue())
 
-    # two functions to manage the list of names of available registers in the Context object
+    # two functions to manage the pool of available registers in the Context object
     def allocate_register(self) -> str:
         """Get the name of a register that is not otherwise
         occupied. Keep exclusive access until it is returned with
         free_register(reg).
         """
-        return self.registers.pop()
+        mask = self.reg_mask
+        if not mask:
+            raise IndexError("No free registers")
+        # Take the highest-numbered free register, matching the
+        # stack behavior of the list pool this replaces.
+        bit = mask.bit_length() - 1
+        self.reg_mask = mask & ~(1 << bit)
+        return REG_NAMES[bit]
 
     def free_register(self, reg_name: str):
         """Return the named register to the pool of
         available registers.
         """
-        self.registers.append(reg_name)
+        self.reg_mask |= 1 << (int(reg_name[1:]) - 1)
+
+    # The gen methods report how each emitted instruction affects
+    # register contents; the bookkeeping below is what makes the
+    # load peephole sound.  All of it is a no-op while the flag
+    # is off.
+
+    def load_symbol(self, target: str, label: str, comment: str = ""):
+        """Emit code leaving the value of memory cell 'label' in
+        register 'target'.  With the peephole on, a register that
+        already holds that cell's value is copied instead of
+        touching memory (a register copy is ADD target,r0,src).
+        """
+        if self.peephole_enabled:
+            contents = self._reg_contents
+            for reg, held in contents.items():
+                if held == label:
+                    if reg != target:
+                        self.add_line(f"    ADD  {target},r0,{reg}  # reuse {label}")
+                        contents[target] = label
+                    return
+            contents[target] = label
+        self.add_line(f"    LOAD {target},{label}{comment}")
+
+    def note_store(self, reg: str, label: str):
+        """Register reg was just STOREd to cell label: reg still
+        holds the value, but any other register recorded as holding
+        that cell is now stale.
+        """
+        if not self.peephole_enabled:
+            return
+        contents = self._reg_contents
+        for other in [r for r, held in contents.items()
+                      if held == label and r != reg]:
+            del contents[other]
+        contents[reg] = label
+
+    def note_clobber(self, reg: str):
+        """Register reg was overwritten with a computed value"""
+        if self.peephole_enabled:
+            self._reg_contents.pop(reg, None)
+
+    def forget_registers(self):
+        """Control flow merges here (label or jump): nothing can be
+        assumed about register contents on the incoming edges.
+        """
+        self._reg_contents.clear()
 
     def get_var_symbol(self, name: str) -> str:
         """Returns the name of the label associated
         with a constant value, and remembers to
         declare it at the end of the source code.
         """
-        label = f"var_{name}"
-        self.vars[name] = label
+        label = self.vars.get(name)
+        if label is None:
+            # Interned for the same reason as the constant labels
+            label = sys.intern(f"var_{name}")
+            self.vars[name] = label
         return label
 
     def new_label(self, prefix: str) -> str:
@@ -7,6 +7,13 @@ Compiler Project
 import context
 from compiler.codegen_context import Context
 
+import operator
+
+import logging
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+
 """Expressions
 Originally for a calculator, expanded for a compiler.
 """
@@ -17,10 +24,17 @@ Originally for a calculator, expanded for a compiler.
 # the calculator
 ENV = dict()
 
+# Values of variables that have been through the resolve pass,
+# indexed by Var.slot.  A slot holding None is an unassigned
+# variable.  Indexing a list is much cheaper than hashing a name
+# into ENV on every variable access in a loop.
+ENV_VALS: "list[IntConst | None]" = []
+
 def env_clear():
     """Clear all variables in calculator memory"""
     global ENV
     ENV = dict()
+    ENV_VALS[:] = [None] * len(ENV_VALS)
 
 
 class UndefinedVariable(Exception):
@@ -33,6 +47,11 @@ class UndefinedVariable(Exception):
 class Expr(object):
     """Abstract base class of all expressions."""
 
+    # Subclasses declare their attributes in __slots__: nodes are
+    # small and numerous, and slot access skips the per-instance
+    # __dict__ in the hot eval/gen paths.
+    __slots__ = ()
+
     def eval(self) -> "IntConst":
         """Implementations of eval should return an integer constant."""
         raise NotImplementedError("Each concrete Expr class must define 'eval'")
@@ -50,6 +69,14 @@ class Expr(object):
     def __eq__(self, other: "Expr") -> bool:
         raise NotImplementedError("__eq__ method not defined for class")
 
+    def _canonical(self) -> tuple:
+        """A tuple form of this expression used for structural
+        equality and hashing.  Tuple comparison runs at C level,
+        so tree equality costs no Python call per node.  Nodes
+        without a structural form compare by identity.
+        """
+        return ("obj", id(self))
+
     # gen = generate (code)
     def gen(self, context: Context, target: str):
         """Generate code into the context object.
@@ -59,10 +86,59 @@ class Expr(object):
         # message about which class we forgot to add a gen method to
         raise NotImplementedError(f"gen method not defined for class {self.__class__.__name__}")
 
+    def fold(self) -> "Expr":
+        """Return an equivalent expression with constant subtrees
+        collapsed, e.g., Plus(IntConst(3), IntConst(4)) becomes
+        IntConst(7).  Leaves and nodes with nothing to fold just
+        return themselves.
+        """
+        return self
+
+    def const_value(self) -> "int | None":
+        """The value of this expression if it is known at compile
+        time, or None if it can only be computed at run time.
+        """
+        return None
+
+    def cse_key(self) -> "tuple | None":
+        """A structural key identifying this expression for
+        common-subexpression elimination, or None if the
+        expression is not pure (e.g., contains a Read).  Two
+        pure expressions with equal keys compute the same value.
+        """
+        return None
+
+    def resolve(self, symtab: "dict[str, int]"):
+        """Assign an ENV_VALS slot to every Var in this tree so
+        the interpreter can access variables by index instead of
+        by name.  Leaves without variables do nothing.
+        """
+        pass
+
 
 class IntConst(Expr):
+
+    __slots__ = ("value", "_gen_ctx", "_gen_label")
+
+    # Interpreted programs churn through small constants (loop
+    # counters, 0 and 1, comparison results), so instances for a
+    # band of small values are shared rather than reallocated.
+    _interned: "dict[int, IntConst]" = {}
+
+    def __new__(cls, value: int):
+        if cls is IntConst and -128 <= value <= 1024:
+            cached = cls._interned.get(value)
+            if cached is None:
+                cached = super().__new__(cls)
+                cls._interned[value] = cached
+            return cached
+        return super().__new__(cls)
+
     def __init__(self, value: int):
         self.value = value
+        # Label memo for gen: valid only for this Context
+        self._gen_ctx: "Context | None" = None
+        self._gen_label: "str | None" = None
 
     def __str__(self) -> str:
         return str(self.value)
@@ -73,19 +149,44 @@ class IntConst(Expr):
     def eval(self) -> "IntConst":
         return self
 
+    def const_value(self) -> "int | None":
+        return self.value
+
+    def cse_key(self) -> "tuple | None":
+        return ("const", self.value)
+
+    def _canonical(self) -> tuple:
+        return ("K", self.value)
+
     def __eq__(self, other: Expr):
-        return isinstance(other, IntConst) and self.value == other.eval().value
+        return isinstance(other, Expr) and self._canonical() == other._canonical()
+
+    def __hash__(self):
+        return hash(("K", self.value))
 
     def gen(self, context: Context, target: str):
         """ Get a constant value into a register/generate
          code into the context object. Result of expression
          evaluation will be left in target register.
         """
-        # create a DATA line for the constant
-        label = context.get_const_symbol(self.value)
+        if context.immediates_enabled and -512 <= self.value <= 511:
+            # Materialize from r0 plus the offset immediate: one
+            # register-only instruction, no memory access, and no
+            # DATA cell to declare
+            context.add_line(f"    ADD  {target},r0,r0[{self.value}]")
+            context.note_clobber(target)
+            return
+
+        # create a DATA line for the constant; generating this
+        # node again for the same context reuses the memoized
+        # label instead of hashing the value again
+        if self._gen_ctx is not context:
+            self._gen_ctx = context
+            self._gen_label = context.get_const_symbol(self.value)
+        label = self._gen_label
 
         # create a LOAD instruction to move that constant value into the target register
-        context.add_line(f"    LOAD {target},{label}")
+        context.load_symbol(target, label)
         return
 
 
@@ -97,9 +198,16 @@ NO_VALUE = IntConst(7777)  # Just an unlikely value to get randomly
 class BinOp(Expr):
     """Abstract base class for binary operators +, *, /, -"""
 
+    __slots__ = ("left", "right", "opsym", "_canon")
+
+    # Commutative operators may swap operands so a constant lands
+    # on the right, where it can become an immediate
+    _commutes = False
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
+        self._canon: "tuple | None" = None
 
     def eval(self) -> "IntConst":
         """Each concrete subclass must define _apply(int, int)->int"""
@@ -107,6 +215,20 @@ class BinOp(Expr):
         right_val = self.right.eval()
         return IntConst(self._apply(left_val.value, right_val.value))
 
+    def fold(self) -> "Expr":
+        """Constant folding: if both operands reduce to constants,
+        apply the operation now and replace the whole subtree with
+        a single IntConst.
+        """
+        left = self.left.fold()
+        right = self.right.fold()
+        if isinstance(left, IntConst) and isinstance(right, IntConst):
+            try:
+                return IntConst(self._apply(left.value, right.value))
+            except ZeroDivisionError:
+                pass  # Leave division by constant zero to fail at runtime
+        return self.__class__(left, right)
+
     def __str__(self) -> str:
         """Implementations of __str__ should return the expression in algebraic notation"""
         return f"({str(self.left)} {self.opsym} {str(self.right)})"
@@ -117,32 +239,85 @@ class BinOp(Expr):
         """
         return f"{self.__class__.__name__}({repr(self.left)}, {repr(self.right)})"
 
+    def _canonical(self) -> tuple:
+        if self._canon is None:
+            self._canon = (self.__class__.__name__,
+                           self.left._canonical(),
+                           self.right._canonical())
+        return self._canon
+
     def __eq__(self, other: "Expr") -> bool:
-        return type(self) == type(other) and  \
-            self.left == other.left and \
-            self.right == other.right
+        return isinstance(other, Expr) and self._canonical() == other._canonical()
+
+    def __hash__(self):
+        return hash(self._canonical())
+
+    def cse_key(self) -> "tuple | None":
+        left_key = self.left.cse_key()
+        right_key = self.right.cse_key()
+        if left_key is None or right_key is None:
+            return None
+        return (self.__class__.__name__, left_key, right_key)
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
 
     def _opcode(self) -> str:
         """Which operation code do we use in the generated assembly code?"""
         raise NotImplementedError("Each binary operator should define the _opcode method")
 
     def gen(self, context: Context, target: str):
-        self.left.gen(context, target)
-        reg = context.allocate_register()
-        self.right.gen(context, reg)
-        context.add_line(f"   {self._opcode()}  {target},{target},{reg}")
-        context.free_register(reg)
+        key = self.cse_key() if context.cse_enabled else None
+        if key is not None:
+            spill = context.cse_cache.get(key)
+            if spill is not None:
+                # This value was already computed and spilled;
+                # reload it instead of recomputing
+                context.load_symbol(target, spill, comment=f"  # reuse {self}")
+                return
+        left, right = self.left, self.right
+        if context.immediates_enabled and self._commutes \
+                and isinstance(left, IntConst) and not isinstance(right, IntConst):
+            left, right = right, left
+        if context.immediates_enabled and isinstance(right, IntConst) \
+                and -512 <= right.value <= 511:
+            # The constant fits in the 10-bit offset field, so fold
+            # it into the instruction: op target,target,r0[value].
+            # No scratch register, no LOAD, no DATA cell.
+            left.gen(context, target)
+            context.add_line(f"   {self._opcode()}  {target},{target},r0[{right.value}]")
+            context.note_clobber(target)
+        else:
+            left.gen(context, target)
+            reg = context.allocate_register()
+            right.gen(context, reg)
+            context.add_line(f"   {self._opcode()}  {target},{target},{reg}")
+            context.note_clobber(target)
+            context.free_register(reg)
+        if key is not None and context.cse_counts.get(key, 0) > 1:
+            # Spill the result so later occurrences of this
+            # subexpression can reload it; subexpressions that
+            # occur only once never earn the STORE
+            spill = context.get_var_symbol(context.new_label("cse"))
+            context.add_line(f"   STORE  {target},{spill}  # save {self}")
+            context.note_store(target, spill)
+            context.cse_cache[key] = spill
 
 
 class Plus(BinOp):
     """left + right"""
 
+    __slots__ = ()
+
+    _commutes = True
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "+"
 
-    def _apply(self, left: int, right: int) -> int:
-        return left + right
+    # operator.add is a C function: no Python frame per addition
+    _apply = staticmethod(operator.add)
 
     def _opcode(self) -> str:
         return "ADD"
@@ -151,12 +326,20 @@ class Plus(BinOp):
 class Minus(BinOp):
     """left - right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "-"
 
-    def _apply(self, left: int, right: int) -> int:
-        return left - right
+    _apply = staticmethod(operator.sub)
+
+    def fold(self) -> "Expr":
+        folded = super().fold()
+        if isinstance(folded, Minus) and isinstance(folded.right, Neg):
+            # x - ~y is x + y; save the sign flip
+            return Plus(folded.left, folded.right.left)
+        return folded
 
     def _opcode(self) -> str:
         return "SUB"
@@ -165,12 +348,29 @@ class Minus(BinOp):
 class Times(BinOp):
     """left * right"""
 
+    __slots__ = ()
+
+    _commutes = True
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "*"
 
-    def _apply(self, left: int, right: int) -> int:
-        return left * right
+    _apply = staticmethod(operator.mul)
+
+    def fold(self) -> "Expr":
+        folded = super().fold()
+        if isinstance(folded, Times):
+            left, right = folded.left, folded.right
+            if isinstance(left, IntConst):
+                left, right = right, left
+            if isinstance(right, IntConst):
+                if right.value == 1:
+                    return left  # x * 1 is x: drop the MUL
+                if right.value == 0 and left.cse_key() is not None:
+                    # x * 0 is 0 when x has no side effects
+                    return IntConst(0)
+        return folded
 
     def _opcode(self) -> str:
         return "MUL"
@@ -179,12 +379,20 @@ class Times(BinOp):
 class Div(BinOp):
     """left // right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "/"
 
-    def _apply(self, left: int, right: int) -> int:
-        return left // right
+    _apply = staticmethod(operator.floordiv)
+
+    def fold(self) -> "Expr":
+        folded = super().fold()
+        if isinstance(folded, Div) and isinstance(folded.right, IntConst) \
+                and folded.right.value == 1:
+            return folded.left  # x / 1 is x: drop the DIV
+        return folded
 
     def _opcode(self) -> str:
         return "DIV"
@@ -193,14 +401,33 @@ class Div(BinOp):
 class UnOp(Expr):
     """Abstract base class for unary operators ~, @"""
 
+    __slots__ = ("left", "opsym", "_canon")
+
     def __init__(self, left: Expr):
         self.left = left
+        self._canon: "tuple | None" = None
 
     def eval(self) -> "IntConst":
         """Each concrete subclass must define _apply(int, int)->int"""
         left_val = self.left.eval()
         return IntConst(self._apply(left_val.value))
 
+    def fold(self) -> "Expr":
+        """Constant folding, as in BinOp but for one operand."""
+        left = self.left.fold()
+        if isinstance(left, IntConst):
+            return IntConst(self._apply(left.value))
+        return self.__class__(left)
+
+    def cse_key(self) -> "tuple | None":
+        left_key = self.left.cse_key()
+        if left_key is None:
+            return None
+        return (self.__class__.__name__, left_key)
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+
     def __str__(self) -> str:
         """Implementations of __str__ should return the expression in algebraic notation"""
         return f"({self.opsym}{str(self.left)})"
@@ -211,49 +438,88 @@ class UnOp(Expr):
         """
         return f"{self.__class__.__name__}({repr(self.left)})"
 
+    def _canonical(self) -> tuple:
+        if self._canon is None:
+            self._canon = (self.__class__.__name__,
+                           self.left._canonical())
+        return self._canon
+
     def __eq__(self, other: "Expr") -> bool:
-        return type(self) == type(other) and  \
-            self.left == other.left
+        return isinstance(other, Expr) and self._canonical() == other._canonical()
+
+    def __hash__(self):
+        return hash(self._canonical())
 
 
 class Neg(UnOp):
     """~left"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr):
         super().__init__(left)
         self.opsym = "~"
 
-    def _apply(self, left: int) -> int:
-        return 0 - left
+    _apply = staticmethod(operator.neg)
+
+    def fold(self) -> "Expr":
+        left = self.left.fold()
+        if isinstance(left, IntConst):
+            return IntConst(-left.value)
+        if isinstance(left, Neg):
+            # ~~x is x; drop both sign flips
+            return left.left
+        return Neg(left)
 
     def gen(self, context: Context, target: str):
         self.left.gen(context, target)
         context.add_line(f"    SUB  {target},r0,{target}  # Flip the sign")
+        context.note_clobber(target)
 
 
 class Abs(UnOp):
     """Absolute value, represented as @"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr):
         super().__init__(left)
         self.opsym = "@"
 
-    def _apply(self, left: int) -> int:
-        return abs(left)
+    _apply = staticmethod(operator.abs)
 
     def gen(self, context: Context, target: str):
         self.left.gen(context, target)
-        pos = context.new_label("already_positive")
-        context.add_line(f"    SUB  r0,{target},r0  # <Abs>")
-        context.add_line(f"    JUMP/PZ {pos}")
-        context.add_line(f"    SUB {target},r0,{target}  # Flip the sign")
-        context.add_line(f"{pos}:   # </Abs>")
+        # Branchless: set the condition flags from the value, then
+        # flip the sign with a predicated SUB that only executes
+        # when the value was negative.  No jump, no label.
+        context.extend_lines([
+            f"    SUB  r0,{target},r0  # <Abs>",
+            f"    SUB/M {target},r0,{target}  # Flip the sign if negative"])
+        context.note_clobber(target)
 
 
 class Var(Expr):
 
+    __slots__ = ("name", "slot", "_sym_ctx", "_sym_label")
+
+    def _canonical(self) -> tuple:
+        return ("V", self.name)
+
+    def __eq__(self, other: "Expr") -> bool:
+        return isinstance(other, Expr) and self._canonical() == other._canonical()
+
+    def __hash__(self):
+        return hash(("V", self.name))
+
     def __init__(self, name: str):
         self.name = name
+        # Filled in by resolve(); None means fall back to the
+        # name-keyed ENV dict
+        self.slot: "int | None" = None
+        # Label memo for gen/lvalue: valid only for this Context
+        self._sym_ctx: "Context | None" = None
+        self._sym_label: "str | None" = None
 
     def __str__(self):
         return self.name
@@ -261,33 +527,60 @@ class Var(Expr):
     def __repr__(self):
         return f"Var({self.name})"
 
+    def resolve(self, symtab: "dict[str, int]"):
+        self.slot = symtab.setdefault(self.name, len(symtab))
+        while len(ENV_VALS) <= self.slot:
+            ENV_VALS.append(None)
+
     def eval(self):
         global ENV
+        if self.slot is not None:
+            value = ENV_VALS[self.slot]
+            if value is None:
+                raise UndefinedVariable(f"{self.name} has not been assigned a value")
+            return value
         if self.name in ENV:
             return ENV[self.name]
         else:
             raise UndefinedVariable(f"{self.name} has not been assigned a value")
 
+    def cse_key(self) -> "tuple | None":
+        return ("var", self.name)
+
     def assign(self, value: IntConst):
-        ENV[self.name] = value
+        if self.slot is not None:
+            ENV_VALS[self.slot] = value
+        else:
+            ENV[self.name] = value
+
+    def _symbol(self, context: Context) -> str:
+        """The assembly label for this variable, memoized per
+        Context so repeated gen calls don't rehash the name.
+        """
+        if self._sym_ctx is not context:
+            self._sym_ctx = context
+            self._sym_label = context.get_var_symbol(self.name)
+        return self._sym_label
 
     def lvalue(self, context: Context) -> str:
         """Return the label that the compiler will use for this variable"""
-        return context.get_var_symbol(self.name)
+        return self._symbol(context)
 
     def gen(self, context: Context, target: str):
         """Generate code into the context object.
         Result of expression evaluation will be
         left in target register.
         """
-        label = context.get_var_symbol(self.name)
-        context.add_line(f"    LOAD {target},{label}")
+        label = self._symbol(context)
+        context.load_symbol(target, label)
         return
 
 
 class Assign(Expr):
     """Assignment:  x = E represented as Assign(x, E)"""
 
+    __slots__ = ("left", "right")
+
     def __init__(self, left: Var, right: Expr):
         assert isinstance(left, Var)  # Can only assign to variables!
         self.left = left
@@ -304,11 +597,22 @@ class Assign(Expr):
         self.left.assign(r_val)
         return r_val
 
+    def fold(self) -> "Expr":
+        return Assign(self.left, self.right.fold())
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
+
     def gen(self, context: Context, target: str):
         """Store value of expression into variable"""
         loc = self.left.lvalue(context)
         self.right.gen(context, target)
         context.add_line(f"   STORE  {target},{loc}")
+        context.note_store(target, loc)
+        # The assigned variable may appear in spilled
+        # subexpressions, which are now stale
+        context.cse_cache.clear()
 
 
 class Control(Expr):
@@ -320,7 +624,7 @@ class Control(Expr):
     in Python and 'void' in C or C++), so we return 0
     from eval.
     """
-    pass
+    __slots__ = ()
     # Note PyCharm will complain that Control doesn't implement all
     # abstract methods, but that's because Control is itself an
     # abstract base class ... the abstract methods should be implemented
@@ -330,6 +634,8 @@ class Control(Expr):
 class Seq(Control):
     """exp ; exp"""
 
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         """ exp ; exp """
         self.left = left
@@ -346,14 +652,60 @@ class Seq(Control):
         discard = self.left.eval()
         return self.right.eval()
 
+    def fold(self) -> "Expr":
+        return Seq(self.left.fold(), self.right.fold())
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
+
     def gen(self, context: Context, target: str):
         self.left.gen(context, target)
         self.right.gen(context, target)
 
 
+class Block(Control):
+    """A sequence of statements, as a flat list.  A chain of Seq
+    nodes costs one Python stack frame per statement in eval and
+    gen; a Block walks any number of statements in one loop.
+    """
+
+    __slots__ = ("stmts",)
+
+    def __init__(self, stmts: "list[Expr]"):
+        self.stmts = stmts
+
+    def __str__(self):
+        body = "\n".join(str(stmt) for stmt in self.stmts)
+        return f"{{\n{body} }}"
+
+    def __repr__(self):
+        return f"Block({self.stmts!r})"
+
+    def eval(self) -> IntConst:
+        """Evaluate in order; value is that of the last statement"""
+        last = NO_VALUE
+        for stmt in self.stmts:
+            last = stmt.eval()
+        return last
+
+    def fold(self) -> "Expr":
+        return Block([stmt.fold() for stmt in self.stmts])
+
+    def resolve(self, symtab: "dict[str, int]"):
+        for stmt in self.stmts:
+            stmt.resolve(symtab)
+
+    def gen(self, context: Context, target: str):
+        for stmt in self.stmts:
+            stmt.gen(context, target)
+
+
 class Print(Control):
     """Print a value.  Returns the value."""
 
+    __slots__ = ("expr",)
+
     def __init__(self, expr: Expr):
         """Print e"""
         self.expr = expr
@@ -369,6 +721,12 @@ class Print(Control):
         print(f"Quack!: {result.value}")
         return result
 
+    def fold(self) -> "Expr":
+        return Print(self.expr.fold())
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.expr.resolve(symtab)
+
     def gen(self, context: Context, target: str):
         """We print by storing to the memory-mapped address 511"""
         self.expr.gen(context, target)
@@ -378,6 +736,8 @@ class Print(Control):
 class Read(Expr):
     """Read a value from input"""
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -393,6 +753,9 @@ class Read(Expr):
 
     def gen(self, context: Context, target: str):
         context.add_line(f"   LOAD  {target},r0,r0[510]")
+        # The input port is not a trackable memory cell: the read
+        # overwrote whatever the load peephole thought was in target
+        context.note_clobber(target)
 
 
 # Abstract base class for comparisons
@@ -414,6 +777,10 @@ class Comparison(Control):
     conditions, because it is jumping to the 'else' branch
     or out of the loop.)
     """
+
+    __slots__ = ("left", "right", "opsym",
+                 "cond_code_true", "cond_code_false", "_canon")
+
     def __init__(self, left: Expr, right: Expr,
                  opsym: str, cond_code_true: str, cond_code_false: str):
         self.left = left
@@ -421,6 +788,7 @@ class Comparison(Control):
         self.opsym = opsym
         self.cond_code_true = cond_code_true
         self.cond_code_false = cond_code_false
+        self._canon: "tuple | None" = None
 
     def __str__(self) -> str:
         return f"{str(self.left)} {self.opsym} {str(self.right)}"
@@ -428,10 +796,18 @@ class Comparison(Control):
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({repr(self.left)}, {repr(self.right)})"
 
+    def _canonical(self) -> tuple:
+        if self._canon is None:
+            self._canon = (self.__class__.__name__,
+                           self.left._canonical(),
+                           self.right._canonical())
+        return self._canon
+
     def __eq__(self, other: "Expr") -> bool:
-        return type(self) == type(other) and  \
-            self.left == other.left and \
-            self.right == other.right
+        return isinstance(other, Expr) and self._canonical() == other._canonical()
+
+    def __hash__(self):
+        return hash(self._canonical())
 
     def eval(self) -> "IntConst":
         """In the interpreter, relations return 0 or 1.
@@ -441,31 +817,72 @@ class Comparison(Control):
         right_val = self.right.eval()
         return IntConst(self._apply(left_val.value, right_val.value))
 
+    def fold(self) -> "Expr":
+        """Fold the operands but keep the comparison node itself:
+        'if' and 'while' need its condjump method.
+        """
+        return self.__class__(self.left.fold(), self.right.fold())
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
+
+    def const_value(self) -> "int | None":
+        """A comparison of two constants is decided at compile time."""
+        left = self.left.const_value()
+        right = self.right.const_value()
+        if left is None or right is None:
+            return None
+        return self._apply(left, right)
+
     def gen(self, context: Context, target: str):
         """We don't support using relational operators to
         produce a value (although it would be easy to add).
         """
         raise NotImplementedError("Relational operators do not support 'gen'; try 'condjump'")
 
+    # Comparing against the other operand order negates the
+    # subtraction result, so the sign conditions trade places
+    _MIRROR = str.maketrans("MP", "PM")
+
     def condjump(self, context: Context, target: str, label: str, jump_cond: bool = True):
         """Generate jump to label conditional on relation. """
-        self.left.gen(context, target)
-        reg = context.allocate_register()
-        self.right.gen(context, reg)
         if jump_cond:
             cond = self.cond_code_true
         else:
             cond = self.cond_code_false
+        left, right = self.left, self.right
+        if isinstance(left, IntConst) and left.value == 0 \
+                and not isinstance(right, IntConst):
+            # 0 OP x is x OP' 0 with mirrored sign conditions;
+            # normalize so the zero shortcut below applies
+            left, right = right, left
+            cond = cond.translate(self._MIRROR)
+        if isinstance(right, IntConst) and right.value == 0:
+            # Comparison against zero (loop bounds, sign tests):
+            # r0 already holds zero, so skip the second register
+            # and its LOAD entirely
+            left.gen(context, target)
+            context.extend_lines([
+                f"   SUB  r0,{target},r0",
+                f"   JUMP/{cond}  {label}  #{self.opsym}"])
+            return
+        left.gen(context, target)
+        reg = context.allocate_register()
+        right.gen(context, reg)
         # All relations are implemented by subtraction.  What varies is
         # the condition code controlling the jump.
-        context.add_line(f"   SUB  r0,{target},{reg}")
-        context.add_line(f"   JUMP/{cond}  {label}  #{self.opsym}")
+        context.extend_lines([
+            f"   SUB  r0,{target},{reg}",
+            f"   JUMP/{cond}  {label}  #{self.opsym}"])
         context.free_register(reg)
 
 
 class NE(Comparison):
     """left != right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right, "!=", "PM", "Z")
 
@@ -476,6 +893,8 @@ class NE(Comparison):
 class GT(Comparison):
     """left > right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right, ">", "P", "ZM")
 
@@ -486,6 +905,8 @@ class GT(Comparison):
 class GE(Comparison):
     """left >= right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right, ">=", "PZ", "M")
 
@@ -496,6 +917,8 @@ class GE(Comparison):
 class LT(Comparison):
     """left < right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right, "<", "M", "PZ")
 
@@ -506,6 +929,8 @@ class LT(Comparison):
 class LE(Comparison):
     """left <= right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right, "<=", "ZM", "P")
 
@@ -516,6 +941,8 @@ class LE(Comparison):
 class EQ(Comparison):
     """left == right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right, "==", "Z", "PM")
 
@@ -523,9 +950,180 @@ class EQ(Comparison):
         return 1 if left == right else 0
 
 
+# Support for hoisting loop-invariant subexpressions out of While
+# bodies: generic child access, a scan for assigned variable names,
+# and a leaf node standing in for a value already in a register.
+
+def _children(exp: Expr) -> tuple:
+    """The direct subexpressions of a node, for generic walks"""
+    if isinstance(exp, (BinOp, Comparison, Seq, Assign)):
+        return (exp.left, exp.right)
+    if isinstance(exp, UnOp):
+        return (exp.left,)
+    if isinstance(exp, Block):
+        return tuple(exp.stmts)
+    if isinstance(exp, Print):
+        return (exp.expr,)
+    if isinstance(exp, While):
+        return (exp.cond, exp.expr)
+    if isinstance(exp, If):
+        return (exp.cond, exp.thenpart, exp.elsepart)
+    return ()
+
+
+def tally_cse_keys(exp: Expr, counts: "dict[tuple, int]"):
+    """Count how often each pure subexpression occurs in the tree.
+    The driver runs this before code generation and hands the
+    counts to the Context; BinOp.gen only spills a result whose
+    key occurs at least twice, so one-off expressions don't pay a
+    dead STORE.
+    """
+    if isinstance(exp, (BinOp, UnOp)):
+        key = exp.cse_key()
+        if key is not None:
+            counts[key] = counts.get(key, 0) + 1
+    for child in _children(exp):
+        tally_cse_keys(child, counts)
+
+
+def _assigned_names(exp: Expr, names: set):
+    """Collect the names of all variables assigned in this tree"""
+    if isinstance(exp, Assign):
+        names.add(exp.left.name)
+    for child in _children(exp):
+        _assigned_names(child, names)
+
+
+def _mentions_any(exp: Expr, names: set) -> bool:
+    """Does this tree read any of the named variables?"""
+    if isinstance(exp, Var):
+        return exp.name in names
+    return any(_mentions_any(child, names) for child in _children(exp))
+
+
+def _collect_invariants(exp: Expr, banned: set, out: list):
+    """Collect maximal pure BinOp/UnOp subtrees that read none of
+    the banned (loop-assigned) variables.  Bare constants and
+    variables are not worth a register, so they don't count.
+    """
+    if isinstance(exp, (BinOp, UnOp)):
+        if exp.cse_key() is not None and not _mentions_any(exp, banned):
+            out.append(exp)
+            return
+    for child in _children(exp):
+        _collect_invariants(child, banned, out)
+
+
+class _PreComputed(Expr):
+    """A value already sitting in a reserved register, standing in
+    for a hoisted loop-invariant subtree.
+    """
+
+    __slots__ = ("reg",)
+
+    def __init__(self, reg: str):
+        self.reg = reg
+
+    def __str__(self):
+        return f"<{self.reg}>"
+
+    def __repr__(self):
+        return f"_PreComputed({self.reg})"
+
+    def gen(self, context: Context, target: str):
+        context.add_line(f"   ADD  {target},{self.reg},r0  # hoisted")
+        context.note_clobber(target)
+
+
+def _substitute(exp: Expr, mapping: "dict[tuple, _PreComputed]") -> Expr:
+    """Rebuild a tree with hoisted subtrees (keyed by cse_key)
+    replaced by their _PreComputed stand-ins.
+    """
+    if isinstance(exp, (BinOp, UnOp)):
+        key = exp.cse_key()
+        if key is not None and key in mapping:
+            return mapping[key]
+    if isinstance(exp, (BinOp, Comparison, Seq)):
+        return exp.__class__(_substitute(exp.left, mapping),
+                             _substitute(exp.right, mapping))
+    if isinstance(exp, UnOp):
+        return exp.__class__(_substitute(exp.left, mapping))
+    if isinstance(exp, Assign):
+        return Assign(exp.left, _substitute(exp.right, mapping))
+    if isinstance(exp, Block):
+        return Block([_substitute(stmt, mapping) for stmt in exp.stmts])
+    if isinstance(exp, Print):
+        return Print(_substitute(exp.expr, mapping))
+    if isinstance(exp, While):
+        return While(_substitute(exp.cond, mapping),
+                     _substitute(exp.expr, mapping))
+    if isinstance(exp, If):
+        return If(_substitute(exp.cond, mapping),
+                  _substitute(exp.thenpart, mapping),
+                  _substitute(exp.elsepart, mapping))
+    return exp
+
+
+# A small postfix machine for arithmetic subtrees.  Recursive eval
+# pays a Python stack frame per node; flattening the tree once into
+# a list of (tag, arg) steps lets a single loop evaluate it with
+# raw ints on a list stack.  Used where the same subtree is
+# evaluated over and over, i.e., loop conditions.
+_PF_PUSH = 0    # arg is an int to push
+_PF_LOAD = 1    # arg is a Var whose current value to push
+_PF_APPLY1 = 2  # arg is a unary _apply function
+_PF_APPLY2 = 3  # arg is a binary _apply function
+
+
+def _linearize(exp: Expr) -> "list[tuple] | None":
+    """Flatten an arithmetic tree (constants, variables, BinOp,
+    UnOp, Comparison) to postfix steps, or None if the tree
+    contains anything else.
+    """
+    if isinstance(exp, IntConst):
+        return [(_PF_PUSH, exp.value)]
+    if isinstance(exp, Var):
+        return [(_PF_LOAD, exp)]
+    if isinstance(exp, UnOp):
+        ops = _linearize(exp.left)
+        if ops is None:
+            return None
+        ops.append((_PF_APPLY1, exp._apply))
+        return ops
+    if isinstance(exp, (BinOp, Comparison)):
+        ops = _linearize(exp.left)
+        right = _linearize(exp.right)
+        if ops is None or right is None:
+            return None
+        ops.extend(right)
+        ops.append((_PF_APPLY2, exp._apply))
+        return ops
+    return None
+
+
+def _run_postfix(ops: "list[tuple]") -> int:
+    """Evaluate postfix steps from _linearize, returning a raw int"""
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    for tag, arg in ops:
+        if tag == _PF_APPLY2:
+            right = pop()
+            stack[-1] = arg(stack[-1], right)
+        elif tag == _PF_PUSH:
+            push(arg)
+        elif tag == _PF_LOAD:
+            push(arg.eval().value)
+        else:
+            stack[-1] = arg(stack[-1])
+    return stack[0]
+
+
 class While(Control):
     """Classic while loop."""
 
+    __slots__ = ("cond", "expr")
+
     def __init__(self, cond: Comparison, expr: Expr):
         """While cond do expr"""
         self.cond = cond
@@ -543,21 +1141,102 @@ class While(Control):
         value.  Returns value of last statement executed.
         """
         last = NO_VALUE
-        cond_val = self.cond.eval()
-        while cond_val.value != 0:
-            last = self.expr.eval()
-            cond_val = self.cond.eval()
+        # Bind the eval methods once; a long loop otherwise pays
+        # two attribute lookups per iteration just to find them.
+        # Note the condition is evaluated at exactly one site --
+        # the loop test -- not once before the loop and once per
+        # iteration as in earlier versions.
+        body_eval = self.expr.eval
+        # The condition runs every iteration, so flatten it to a
+        # postfix program when it is plain arithmetic
+        cond_ops = _linearize(self.cond)
+        if cond_ops is not None:
+            while _run_postfix(cond_ops) != 0:
+                last = body_eval()
+        else:
+            cond_eval = self.cond.eval
+            while cond_eval().value != 0:
+                last = body_eval()
         return last
 
+    def fold(self) -> "Expr":
+        return While(self.cond.fold(), self.expr.fold())
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.cond.resolve(symtab)
+        self.expr.resolve(symtab)
+
+    def _hoist_invariants(self, context: Context, target: str):
+        """Generate loop-invariant subexpressions of the condition
+        and body into reserved registers, once, ahead of the loop.
+        Returns the (possibly rewritten) condition and body plus
+        the registers to release after the loop.
+        """
+        assigned: set = set()
+        _assigned_names(self.cond, assigned)
+        _assigned_names(self.expr, assigned)
+        candidates: list = []
+        _collect_invariants(self.cond, assigned, candidates)
+        _collect_invariants(self.expr, assigned, candidates)
+        mapping: "dict[tuple, _PreComputed]" = {}
+        hoisted_regs: "list[str]" = []
+        for exp in candidates:
+            key = exp.cse_key()
+            if key in mapping:
+                continue  # identical invariants share one register
+            if context.reg_mask.bit_count() <= 4:
+                break  # leave scratch registers for the body
+            reg = context.allocate_register()
+            exp.gen(context, reg)
+            mapping[key] = _PreComputed(reg)
+            hoisted_regs.append(reg)
+        if mapping:
+            return (_substitute(self.cond, mapping),
+                    _substitute(self.expr, mapping),
+                    hoisted_regs)
+        return self.cond, self.expr, hoisted_regs
+
     def gen(self, context: Context, target: str):
         """Looping"""
-        loop_head = context.new_label("while_do")
-        loop_exit = context.new_label("od")
-        context.add_line(f"{loop_head}:")
-        self.cond.condjump(context, target, loop_exit, jump_cond=False)
-        self.expr.gen(context, target)
-        context.add_line(f"   JUMP  {loop_head}")
-        context.add_line(f"{loop_exit}:")
+        cond_value = self.cond.const_value()
+        if cond_value == 0:
+            # Condition is constantly false; the loop never runs
+            return
+        if cond_value is None:
+            # Compute loop-invariant subexpressions before the head
+            cond, body, hoisted_regs = self._hoist_invariants(context, target)
+            loop_head = context.new_label("while_do")
+            loop_exit = context.new_label("od")
+            # Spills recorded before the loop are stale on the back
+            # edge: variables assigned in the body change between
+            # iterations, so the condition and body must not reload
+            # pre-loop spill cells
+            context.cse_cache.clear()
+            # The labels are merge points: registers may arrive with
+            # different contents on different edges
+            context.forget_registers()
+            context.add_line(f"{loop_head}:")
+            cond.condjump(context, target, loop_exit, jump_cond=False)
+            body.gen(context, target)
+            context.add_line(f"   JUMP  {loop_head}")
+            context.add_line(f"{loop_exit}:")
+            context.forget_registers()
+            for reg in hoisted_regs:
+                context.free_register(reg)
+            # Spills from inside the loop may never have run
+            # (zero iterations), so forget them
+            context.cse_cache.clear()
+        else:
+            # Condition is constantly true; there is no way out,
+            # so skip the test and the exit label
+            log.warning(f"'while {self.cond}' never terminates")
+            loop_head = context.new_label("while_do")
+            # Pre-loop spills are stale on the back edge here too
+            context.cse_cache.clear()
+            context.forget_registers()
+            context.add_line(f"{loop_head}:")
+            self.expr.gen(context, target)
+            context.add_line(f"   JUMP  {loop_head}")
 
 
 class Pass(Control):
@@ -566,6 +1245,8 @@ class Pass(Control):
     is a stand-in for the empty block ... it does nothing.
     """
 
+    __slots__ = ()
+
     def __init__(self):
         """La la la la la I can't hear you"""
         return
@@ -587,6 +1268,8 @@ class Pass(Control):
 class If(Control):
     """If with optional Else (no elif)"""
 
+    __slots__ = ("cond", "thenpart", "elsepart")
+
     def __init__(self, cond, thenpart, elsepart=Pass()):
         """if cond then block else block fi"""
         self.cond = cond
@@ -608,6 +1291,14 @@ class If(Control):
             result = self.elsepart.eval()
         return result
 
+    def fold(self) -> "Expr":
+        return If(self.cond.fold(), self.thenpart.fold(), self.elsepart.fold())
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.cond.resolve(symtab)
+        self.thenpart.resolve(symtab)
+        self.elsepart.resolve(symtab)
+
     def gen(self, context: Context, target: str):
         """
         Code generation for if/else/fi
@@ -617,15 +1308,31 @@ class If(Control):
         - Generate the label for the else part, followed by the code for the else part.
         - Generate the label for the end of the if/else/fi
         """
+        cond_value = self.cond.const_value()
+        if cond_value is not None:
+            # Condition is decided at compile time; emit only
+            # the branch that can run
+            if cond_value != 0:
+                self.thenpart.gen(context, target)
+            else:
+                self.elsepart.gen(context, target)
+            return
         else_label = context.new_label("else")
         fi_label = context.new_label("fi")
 
         self.cond.condjump(context, target, else_label, jump_cond=False)
         self.thenpart.gen(context, target)  # Generate code for the then part
-        context.add_line(f"   JUMP  {fi_label}")  # Jump to the end of the if/else/fi
-        context.add_line(f"{else_label}:")  # Jump to the end of the if/else/fi
+        # Spills from the then part don't happen on the else path
+        context.cse_cache.clear()
+        # Jump to the end of the if/else/fi, then the else label
+        context.extend_lines([f"   JUMP  {fi_label}", f"{else_label}:"])
+        # Labels are merge points for register contents too
+        context.forget_registers()
         self.elsepart.gen(context, target)  # the else part
         context.add_line(f"{fi_label}:")
+        context.forget_registers()
+        # After the join, spills from either branch may not have run
+        context.cse_cache.clear()
 
 
 
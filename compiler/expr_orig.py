@@ -2,16 +2,37 @@
 Originally for a calculator, expanded for a compiler.
 """
 
+import sys
+
 # Global variable NO_VALUE is defined below after IntConst
 
 # One global environment (scope) for
 # the calculator
 ENV = dict()
 
+# Values of variables that have been through the resolve pass,
+# indexed by the slot number resolve assigned to each name.  The
+# name-keyed ENV dict stays for the interactive calculator, which
+# can introduce new names between inputs.
+ENV_VALS: "list[int | None]" = []
+
+# Version stamp for results memoized on pure subtrees.  Each
+# operator node keeps its own (version, result) pair; the pair is
+# valid only while the version matches _ENV_VERSION, which
+# Var.assign bumps on every store.  A While condition that mentions
+# no reassigned variable thus costs one attribute read per
+# iteration instead of a recursive walk.  (The memo lives on the
+# node rather than in an id-keyed dict: ids are recycled after a
+# node is collected, so a detached dict could serve one node's
+# result to another.)
+_ENV_VERSION = 0
+
 def env_clear():
     """Clear all variables in calculator memory"""
-    global ENV
+    global ENV, _ENV_VERSION
     ENV = dict()
+    ENV_VALS.clear()
+    _ENV_VERSION += 1
 
 
 class UndefinedVariable(Exception):
@@ -24,19 +45,54 @@ class UndefinedVariable(Exception):
 class Expr(object):
     """Abstract base class of all expressions."""
 
+    __slots__ = ("_str_cache", "_repr_cache", "_eval_memo")
+
     def eval(self) -> "IntConst":
-        """Implementations of eval should return an integer constant."""
-        raise NotImplementedError("Each concrete Expr class must define 'eval'")
+        """Evaluate and box the result.  Internally evaluation
+        works on raw ints through _eval_int; only this outer
+        wrapper allocates an IntConst, so arithmetic in loop
+        bodies doesn't build a throwaway object per step.
+        """
+        return _int(self._eval_int())
+
+    def _eval_int(self) -> int:
+        """Implementations of _eval_int should return a plain int."""
+        raise NotImplementedError("Each concrete Expr class must define '_eval_int'")
 
     def __str__(self) -> str:
-        """Implementations of __str__ should return the expression in algebraic notation"""
-        raise NotImplementedError("Each concrete Expr class must define __str__")
+        """The expression in algebraic notation.  Nodes are never
+        mutated after parsing, so the string is built once and
+        cached; repeated str() calls on debug paths are free.
+        """
+        cached = getattr(self, "_str_cache", None)
+        if cached is None:
+            cached = self._build_str()
+            self._str_cache = cached
+        return cached
+
+    def _build_str(self) -> str:
+        """Implementations of _build_str should return the expression in algebraic notation"""
+        raise NotImplementedError("Each concrete Expr class must define '_build_str'")
 
     def __repr__(self) -> str:
-        """Implementations of __repr__ should return a string that looks like
-        the constructor, e.g., Plus(IntConst(5), IntConst(4))
+        """A string that looks like the constructor, e.g.,
+        Plus(IntConst(5), IntConst(4)).  Cached like __str__.
+        """
+        cached = getattr(self, "_repr_cache", None)
+        if cached is None:
+            cached = self._build_repr()
+            self._repr_cache = cached
+        return cached
+
+    def _build_repr(self) -> str:
+        raise NotImplementedError(f"Class {self.__class__.__name__} doesn't define '_build_repr'")
+
+    def resolve(self, symtab: "dict[str, int]"):
+        """Number the variables in this subtree so evaluation can
+        access them by slot index rather than by name.  Leaf nodes
+        without variables have nothing to do.
         """
-        raise NotImplementedError(f"Class {self.__class__.__name__} doesn't define __repr__")
+        pass
 
     def __eq__(self, other: "Expr") -> bool:
         raise NotImplementedError("__eq__ method not defined for class")
@@ -44,18 +100,24 @@ class Expr(object):
 
 
 class IntConst(Expr):
+
+    __slots__ = ("value",)
+
     def __init__(self, value: int):
         self.value = value
 
-    def __str__(self) -> str:
+    def _build_str(self) -> str:
         return str(self.value)
 
-    def __repr__(self) -> str:
+    def _build_repr(self) -> str:
         return f"IntConst({self.value})"
 
     def eval(self) -> "IntConst":
         return self
 
+    def _eval_int(self) -> int:
+        return self.value
+
     def __eq__(self, other: Expr):
         return isinstance(other, IntConst) and self.value == other.eval().value
 
@@ -64,26 +126,60 @@ class IntConst(Expr):
 # IntConst to define this one.
 NO_VALUE = IntConst(7777)  # Just an unlikely value to get randomly
 
+# Shared IntConst objects for a band of small values, in the spirit
+# of CPython's small-int cache.  A loop whose condition boxes 0 or 1
+# every iteration reuses these instead of allocating.
+_SMALL_INT = [IntConst(i) for i in range(-128, 257)]
+
+def _int(value: int) -> IntConst:
+    """Box an int, reusing the shared object for small values"""
+    if -128 <= value < 257:
+        return _SMALL_INT[value + 128]
+    return IntConst(value)
+
+
+def _is_pure(exp: Expr) -> bool:
+    """True if exp keeps yielding the same value until some variable
+    is reassigned.  Read consumes input, so a subtree holding one
+    must be re-run every time and can never enter the cache.
+    """
+    if isinstance(exp, (IntConst, Var)):
+        return True
+    if isinstance(exp, (BinOp, Comparison)):
+        return _is_pure(exp.left) and _is_pure(exp.right)
+    if isinstance(exp, UnOp):
+        return _is_pure(exp.left)
+    return False
+
 
 class BinOp(Expr):
     """Abstract base class for binary operators +, *, /, -"""
 
+    __slots__ = ("left", "right", "opsym")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
 
-    def eval(self) -> "IntConst":
+    def _eval_int(self) -> int:
         """Each concrete subclass must define _apply(int, int)->int"""
-        left_val = self.left.eval()
-        right_val = self.right.eval()
-        return IntConst(self._apply(left_val.value, right_val.value))
+        hit = getattr(self, "_eval_memo", None)
+        if hit is not None and hit[0] == _ENV_VERSION:
+            return hit[1]
+        result = self._apply(self.left._eval_int(), self.right._eval_int())
+        if _is_pure(self):
+            self._eval_memo = (_ENV_VERSION, result)
+        return result
 
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
 
-    def __str__(self) -> str:
+    def _build_str(self) -> str:
         """Implementations of __str__ should return the expression in algebraic notation"""
         return f"({str(self.left)} {self.opsym} {str(self.right)})"
 
-    def __repr__(self) -> str:
+    def _build_repr(self) -> str:
         """Implementations of __repr__ should return a string that looks like
         the constructor, e.g., Plus(IntConst(5), IntConst(4))
         """
@@ -102,6 +198,8 @@ class BinOp(Expr):
 class Plus(BinOp):
     """left + right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "+"
@@ -113,6 +211,8 @@ class Plus(BinOp):
 class Minus(BinOp):
     """left - right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "-"
@@ -124,6 +224,8 @@ class Minus(BinOp):
 class Times(BinOp):
     """left * right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "*"
@@ -135,6 +237,8 @@ class Times(BinOp):
 class Div(BinOp):
     """left // right"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr, right: Expr):
         super().__init__(left, right)
         self.opsym = "/"
@@ -146,19 +250,29 @@ class Div(BinOp):
 class UnOp(Expr):
     """Abstract base class for unary operators ~, @"""
 
+    __slots__ = ("left", "opsym")
+
     def __init__(self, left: Expr):
         self.left = left
 
-    def eval(self) -> "IntConst":
+    def _eval_int(self) -> int:
         """Each concrete subclass must define _apply(int, int)->int"""
-        left_val = self.left.eval()
-        return IntConst(self._apply(left_val.value))
+        hit = getattr(self, "_eval_memo", None)
+        if hit is not None and hit[0] == _ENV_VERSION:
+            return hit[1]
+        result = self._apply(self.left._eval_int())
+        if _is_pure(self):
+            self._eval_memo = (_ENV_VERSION, result)
+        return result
 
-    def __str__(self) -> str:
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+
+    def _build_str(self) -> str:
         """Implementations of __str__ should return the expression in algebraic notation"""
         return f"({self.opsym}{str(self.left)})"
 
-    def __repr__(self) -> str:
+    def _build_repr(self) -> str:
         """Implementations of __repr__ should return a string that looks like
         the constructor, e.g., Plus(IntConst(5), IntConst(4))
         """
@@ -171,6 +285,8 @@ class UnOp(Expr):
 class Neg(UnOp):
     """~left"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr):
         super().__init__(left)
         self.opsym = "~"
@@ -182,6 +298,8 @@ class Neg(UnOp):
 class Abs(UnOp):
     """Absolute value, represented as @"""
 
+    __slots__ = ()
+
     def __init__(self, left: Expr):
         super().__init__(left)
         self.opsym = "@"
@@ -192,42 +310,69 @@ class Abs(UnOp):
 
 class Var(Expr):
 
+    __slots__ = ("name", "slot")
+
     def __init__(self, name: str):
         self.name = name
+        # Filled in by resolve(); None means fall back to the
+        # name-keyed ENV dict
+        self.slot: "int | None" = None
 
-    def __str__(self):
+    def _build_str(self):
         return self.name
 
-    def __repr__(self):
+    def _build_repr(self):
         return f"Var({self.name})"
 
-    def eval(self):
+    def resolve(self, symtab: "dict[str, int]"):
+        self.slot = symtab.setdefault(self.name, len(symtab))
+        while len(ENV_VALS) <= self.slot:
+            ENV_VALS.append(None)
+
+    def _eval_int(self) -> int:
         global ENV
+        if self.slot is not None:
+            value = ENV_VALS[self.slot]
+            if value is None:
+                raise UndefinedVariable(f"{self.name} has not been assigned a value")
+            return value
         if self.name in ENV:
             return ENV[self.name]
         else:
             raise UndefinedVariable(f"{self.name} has not been assigned a value")
 
-    def assign(self, value: IntConst):
-        ENV[self.name] = value
+    def assign(self, value: int):
+        """The environment holds raw ints; eval boxes on the way out."""
+        global _ENV_VERSION
+        _ENV_VERSION += 1
+        if self.slot is not None:
+            ENV_VALS[self.slot] = value
+        else:
+            ENV[self.name] = value
 
 
 class Assign(Expr):
     """Assignment:  x = E represented as Assign(x, E)"""
 
+    __slots__ = ("left", "right")
+
     def __init__(self, left: Var, right: Expr):
         assert isinstance(left, Var)  # Can only assign to variables!
         self.left = left
         self.right = right
 
-    def __str__(self) -> str:
+    def _build_str(self) -> str:
         return f"{self.left} = {self.right}"
 
-    def __repr__(self) -> str:
+    def _build_repr(self) -> str:
         return f"Assign({repr(self.left)}, {repr(self.right)})"
 
-    def eval(self) -> IntConst:
-        r_val = self.right.eval()
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
+
+    def _eval_int(self) -> int:
+        r_val = self.right._eval_int()
         self.left.assign(r_val)
         return r_val
 
@@ -241,6 +386,8 @@ class Control(Expr):
     in Python and 'void' in C or C++), so we return 0
     from eval.
     """
+
+    __slots__ = ()
     pass
     # Note PyCharm will complain that Control doesn't implement all
     # abstract methods, but that's because Control is itself an
@@ -251,57 +398,116 @@ class Control(Expr):
 class Seq(Control):
     """exp ; exp"""
 
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         """ exp ; exp """
         self.left = left
         self.right = right
 
-    def __str__(self):
+    def _build_str(self):
         return f"{{\n{self.left}\n{self.right} }}"
 
-    def __repr__(self):
+    def _build_repr(self):
         return f"Seq({repr(self.left)}, {repr(self.right)}"
 
-    def eval(self) -> IntConst:
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
+
+    def _eval_int(self) -> int:
         """Just evaluate in order"""
-        discard = self.left.eval()
-        return self.right.eval()
+        discard = self.left._eval_int()
+        return self.right._eval_int()
+
+
+class Block(Control):
+    """A whole sequence of statements, kept as a flat list.  Unlike
+    a chain of Seq nodes, evaluating a long program costs one Python
+    frame, not one per statement.
+    """
+
+    __slots__ = ("stmts",)
+
+    def __init__(self, stmts: "list[Expr]"):
+        self.stmts = stmts
+
+    def _build_str(self):
+        body = "\n".join(str(stmt) for stmt in self.stmts)
+        return f"{{\n{body} }}"
+
+    def _build_repr(self):
+        return f"Block({self.stmts!r})"
+
+    def resolve(self, symtab: "dict[str, int]"):
+        for stmt in self.stmts:
+            stmt.resolve(symtab)
+
+    def _eval_int(self) -> int:
+        """Evaluate in order; value is that of the last statement"""
+        last = NO_VALUE.value
+        for stmt in self.stmts:
+            last = stmt._eval_int()
+        return last
 
 
 class Print(Control):
     """Print a value.  Returns the value."""
 
+    __slots__ = ("expr",)
+
     def __init__(self, expr: Expr):
         """Print e"""
         self.expr = expr
 
-    def __str__(self):
+    def _build_str(self):
         return f"print {self.expr};"
 
-    def __repr__(self):
+    def _build_repr(self):
         return f"Print({repr(self.expr)})"
 
-    def eval(self) -> IntConst:
-        result = self.expr.eval()
-        print(f"Quack!: {result.value}")
+    def resolve(self, symtab: "dict[str, int]"):
+        self.expr.resolve(symtab)
+
+    def _eval_int(self) -> int:
+        result = self.expr._eval_int()
+        print(f"Quack!: {result}")
         return result
 
 
+# Buffered input for Read when stdin is a pipe or file: all the
+# integers are slurped once and dealt from an iterator, instead of
+# a prompt-and-readline round trip per read.
+_read_iter = None
+
+
 class Read(Expr):
     """Read a value from input"""
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
-    def __str__(self):
+    def _build_str(self):
         return "(read)"
 
-    def __repr__(self):
+    def _build_repr(self):
         return "Read()"
 
-    def eval(self) -> IntConst:
-        val = input("Quack! Gimme an int! ")
-        return IntConst(int(val))
+    def _eval_int(self) -> int:
+        global _read_iter
+        if sys.stdin.isatty():
+            # Interactive: prompt one value at a time
+            return int(input("Quack! Gimme an int! "))
+        if _read_iter is None:
+            _read_iter = iter(int(tok)
+                              for line in sys.stdin for tok in line.split())
+        try:
+            return next(_read_iter)
+        except StopIteration:
+            # Same signal input() gives at end of file
+            raise EOFError("Out of input") from None
 
 
 class Comparison(Control):
@@ -322,15 +528,18 @@ class Comparison(Control):
     conditions, because it is jumping to the 'else' branch
     or out of the loop.)
     """
+
+    __slots__ = ("left", "right")
+
     def __init__(self, left: Expr, right: Expr):
         self.left = left
         self.right = right
 
-    def __str__(self) -> str:
+    def _build_str(self) -> str:
         # Fix this up when you implement code generation
         return f"{str(self.left)} <comparison> {str(self.right)}"
 
-    def __repr__(self) -> str:
+    def _build_repr(self) -> str:
         return f"{self.__class__.__name__}({repr(self.left)}, {repr(self.right)})"
 
     def __eq__(self, other: "Expr") -> bool:
@@ -338,119 +547,192 @@ class Comparison(Control):
             self.left == other.left and \
             self.right == other.right
 
-    def eval(self) -> "IntConst":
+    def _eval_int(self) -> int:
         """In the interpreter, relations return 0 or 1.
         Each concrete subclass must define _apply(int, int)->int
         """
-        left_val = self.left.eval()
-        right_val = self.right.eval()
-        return IntConst(self._apply(left_val.value, right_val.value))
+        hit = getattr(self, "_eval_memo", None)
+        if hit is not None and hit[0] == _ENV_VERSION:
+            return hit[1]
+        result = self._apply(self.left._eval_int(), self.right._eval_int())
+        if _is_pure(self):
+            self._eval_memo = (_ENV_VERSION, result)
+        return result
+
+    def resolve(self, symtab: "dict[str, int]"):
+        self.left.resolve(symtab)
+        self.right.resolve(symtab)
 
 
 class EQ(Comparison):
     """left == right"""
 
+    __slots__ = ()
+
     def _apply(self, left: int, right: int) -> int:
         return 1 if left == right else 0
 
 class NE(Comparison):
     """left != right"""
 
+    __slots__ = ()
+
     def _apply(self, left: int, right: int) -> int:
         return 1 if left != right else 0
 
 class GT(Comparison):
     """left > right"""
 
+    __slots__ = ()
+
     def _apply(self, left: int, right: int) -> int:
         return 1 if left > right else 0
 
 class GE(Comparison):
     """left >= right"""
 
+    __slots__ = ()
+
     def _apply(self, left: int, right: int) -> int:
         return 1 if left >= right else 0
 
 class LT(Comparison):
 
+    __slots__ = ()
+
     def _apply(self, left: int, right: int) -> int:
         return 1 if left < right else 0
 
 class LE(Comparison):
 
+    __slots__ = ()
+
     def _apply(self, left: int, right: int) -> int:
         return 1 if left <= right else 0
 
 
+# Direct predicate functions for the comparison classes, used by
+# While to test its condition without dispatching through
+# Comparison._eval_int on every iteration.
+_WHILE_PREDS = {
+    EQ: lambda left, right: left == right,
+    NE: lambda left, right: left != right,
+    GT: lambda left, right: left > right,
+    GE: lambda left, right: left >= right,
+    LT: lambda left, right: left < right,
+    LE: lambda left, right: left <= right,
+}
+
+
 class While(Control):
     """Classic while loop."""
 
+    __slots__ = ("cond", "expr", "_pred")
+
     def __init__(self, cond: Comparison, expr: Expr):
         """While cond do expr"""
         self.cond = cond
         self.expr = expr
+        # Specialize the loop header on the condition's concrete
+        # class: bind its operands and comparison once, here, so
+        # the hot loop is a plain closure call
+        compare = _WHILE_PREDS.get(type(cond))
+        if compare is not None:
+            left, right = cond.left, cond.right
+            self._pred = lambda: compare(left._eval_int(), right._eval_int())
+        else:
+            self._pred = None
 
-    def __str__(self):
+    def _build_str(self):
         return f"while {self.cond} do\n{self.expr}\nod"
 
-    def __repr__(self):
+    def _build_repr(self):
         return f"While({repr(self.cond)}, {repr(self.expr)})"
 
-    def eval(self) -> IntConst:
+    def _eval_int(self) -> int:
         """
         Repeat 'expr' part while 'cond' part evaluates to a non-zero
         value.  Returns value of last statement executed.
         """
-        last = NO_VALUE
-        cond_val = self.cond.eval()
-        while cond_val.value != 0:
-            last = self.expr.eval()
-            cond_val = self.cond.eval()
+        last = NO_VALUE.value
+        pred = self._pred
+        if pred is not None:
+            body = self.expr._eval_int
+            while pred():
+                last = body()
+            return last
+        # Condition isn't a recognized comparison; evaluate it
+        # the general way
+        cond_val = self.cond._eval_int()
+        while cond_val != 0:
+            last = self.expr._eval_int()
+            cond_val = self.cond._eval_int()
         return last
 
+    def resolve(self, symtab: "dict[str, int]"):
+        self.cond.resolve(symtab)
+        self.expr.resolve(symtab)
+
 class Pass(Control):
     """
     The 'else' part of an 'if' statement is optional.  This node
     is a stand-in for the empty block ... it does nothing.
     """
 
+    __slots__ = ()
+
     def __init__(self):
         """La la la la la I can't hear you"""
         return
 
-    def __repr__(self):
+    def _build_repr(self):
         return "pass"
 
-    def __str__(self):
+    def _build_str(self):
         return "pass"
 
     def eval(self) -> IntConst:
         """Does nothing, has no value."""
         return NO_VALUE
 
+    def _eval_int(self) -> int:
+        return NO_VALUE.value
+
+
+# Pass has no state, so every If without an else part can share
+# one instance instead of constructing its own.
+_PASS_SINGLETON = Pass()
+
 
 class If(Control):
     """If with optional Else (no elif)"""
 
-    def __init__(self, cond, thenpart, elsepart=Pass()):
+    __slots__ = ("cond", "thenpart", "elsepart")
+
+    def __init__(self, cond, thenpart, elsepart=None):
         """if cond then block else block fi"""
         self.cond = cond
         self.thenpart = thenpart
-        self.elsepart = elsepart
+        self.elsepart = elsepart if elsepart is not None else _PASS_SINGLETON
 
-    def __str__(self):
+    def _build_str(self):
         return "if {} then\n{}\nelse\n{}\nfi".format(self.cond, self.thenpart, self.elsepart)
 
-    def __repr__(self):
+    def _build_repr(self):
         return f"If({repr((self.cond))}, {repr(self.thenpart)}, {repr(self.elsepart)})"
 
-    def eval(self) -> IntConst:
+    def resolve(self, symtab: "dict[str, int]"):
+        self.cond.resolve(symtab)
+        self.thenpart.resolve(symtab)
+        self.elsepart.resolve(symtab)
+
+    def _eval_int(self) -> int:
         """If statement.  Returns nothing. """
-        cond_value = self.cond.eval()
-        if cond_value.value != 0:
-            result = self.thenpart.eval()
+        cond_value = self.cond._eval_int()
+        if cond_value != 0:
+            result = self.thenpart._eval_int()
         else:
-            result = self.elsepart.eval()
+            result = self.elsepart._eval_int()
         return result
 
 
@@ -11,6 +11,7 @@ import io
 
 import context as path_context # So it doesn't collide with codegen_context
 from compiler.llparse import parse
+import compiler.bytecode as bytecode
 
 import argparse
 import sys
@@ -42,7 +43,10 @@ def main():
     try:
         exp = parse(args.sourcefile)
         log.debug(repr(exp))
-        exp.eval()
+        # Flatten the tree into bytecode once, then run the
+        # single dispatch loop instead of recursive eval
+        code, names = bytecode.compile(exp)
+        bytecode.run(code, names)
         print("#Interpretation complete")
     except Exception as e:
         print("Failed!")
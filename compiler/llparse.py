@@ -27,8 +27,23 @@ class InputError(Exception):
     pass
 
 
+# Var nodes interned by name for the current parse: every occurrence
+# of a variable shares one node, so a program with ten references to
+# i builds one Var instead of ten.
+_var_pool: "dict[str, expr.Var]" = {}
+
+
+def _var(name: str) -> expr.Var:
+    node = _var_pool.get(name)
+    if node is None:
+        node = expr.Var(name)
+        _var_pool[name] = node
+    return node
+
+
 def parse(srcfile: TextIO) -> expr.Expr:
     """Interface function to LL parser of Dumbol"""
+    _var_pool.clear()
     stream = TokenStream(srcfile)
     return _program(stream)
 
@@ -57,6 +72,13 @@ first["assignment"] = {TokenCat.VAR}
 first["stmt"] = first["ifstmt"].union(first["whilestmt"], first["assignment"], first["printstmt"])
 first["exp"] = {TokenCat.VAR, TokenCat.INT, TokenCat.LPAREN, TokenCat.READ }
 
+# Frozen operator sets for the _expr/_term inner loops: comparing
+# the peeked token's kind against these skips a string compare and
+# a list scan per token.
+_ADDOPS = frozenset({TokenCat.PLUS, TokenCat.MINUS})
+_MULOPS = frozenset({TokenCat.TIMES, TokenCat.DIV})
+_FIRST_STMT = frozenset(first["stmt"])
+
 # Initial version: Just sums
 
 def require(stream: TokenStream, category: TokenCat, desc: str = "", consume=False):
@@ -84,15 +106,19 @@ def _block(stream: TokenStream) -> expr.Expr:
     block ::= { stmt }
     """
     log.debug(f"Parsing block from token {stream.peek()}")
-    if stream.peek().kind not in first["stmt"]:
+    if stream.peek().kind not in _FIRST_STMT:
         return expr.Pass()
-    left = _stmt(stream)
-    log.debug(f"Starting block with {left}")
-    while stream.peek().kind in first["stmt"]:
-        right = _stmt(stream)
-        log.debug(f"Adding statement to block: {right}")
-        left = expr.Seq(left, right)
-    return left
+    stmts = [_stmt(stream)]
+    log.debug(f"Starting block with {stmts[0]}")
+    while stream.peek().kind in _FIRST_STMT:
+        stmt = _stmt(stream)
+        log.debug(f"Adding statement to block: {stmt}")
+        stmts.append(stmt)
+    if len(stmts) == 1:
+        return stmts[0]
+    # A flat Block rather than a chain of Seq nodes, so a long
+    # program doesn't evaluate recursively statement by statement
+    return expr.Block(stmts)
 
 
 def _stmt(stream: TokenStream) -> expr.Expr:
@@ -100,16 +126,16 @@ def _stmt(stream: TokenStream) -> expr.Expr:
     #  stmt ::=  (assign | loop | ifstmt | printstmt) ';'
     assignment ::= IDENT '=' expression
     """
-    if stream.peek().kind is TokenCat.WHILE:
-        node = _while(stream)
-    elif stream.peek().kind is TokenCat.IF:
-        node = _if(stream)
-    elif stream.peek().kind is TokenCat.PRINT:
-        node = _print(stream)
+    # Predict the production from the next token through a table
+    # rather than an if/elif chain; _STMT_DISPATCH is built below,
+    # after the rule functions it points at.
+    handler = _STMT_DISPATCH.get(stream.peek().kind)
+    if handler is not None:
+        node = handler(stream)
     elif stream.peek().kind is not TokenCat.VAR:
         raise InputError(f"Expecting identifier at beginning of assignment, got {stream.peek()}")
     else:
-        target = expr.Var(stream.take().value)
+        target = _var(stream.take().value)
         if stream.peek().kind is not TokenCat.ASSIGN:
             raise InputError(f"Expecting assignment symbol, got {stream.peek()}")
         stream.take()  # Discard '=' token
@@ -153,6 +179,55 @@ def _if(stream: TokenStream) -> expr.If:
     require(stream, TokenCat.FI, consume=True)
     return result
 
+
+# The statement prediction table: maps the lookahead token kind to
+# the rule that parses it.  Assignment is the fallback in _stmt
+# since its lookahead (VAR) doesn't identify the production alone.
+_STMT_DISPATCH = {
+    TokenCat.WHILE: _while,
+    TokenCat.IF: _if,
+    TokenCat.PRINT: _print,
+}
+
+
+def _mk(cls, *operands) -> expr.Expr:
+    """Build an AST node, folding it to a single IntConst when
+    every operand is already a constant.  Arithmetic like 5 * 3 + 2
+    and conditions like 0 < 100 collapse once at parse time rather
+    than re-evaluating on every loop iteration.
+
+    Identity operands are dropped the same way: e + 0, e - 0,
+    e * 1, and e / 1 reduce to e, and e * 0 to 0 when e has no
+    side effects.
+    """
+    if len(operands) == 2:
+        left, right = operands
+        if isinstance(right, expr.IntConst) and not isinstance(left, expr.IntConst):
+            if right.value == 0 and (cls is expr.Plus or cls is expr.Minus):
+                return left
+            if right.value == 1 and (cls is expr.Times or cls is expr.Div):
+                return left
+            if right.value == 0 and cls is expr.Times \
+                    and left.cse_key() is not None:
+                return expr.IntConst(0)
+        elif isinstance(left, expr.IntConst) and not isinstance(right, expr.IntConst):
+            if left.value == 0 and cls is expr.Plus:
+                return right
+            if left.value == 1 and cls is expr.Times:
+                return right
+            if left.value == 0 and cls is expr.Times \
+                    and right.cse_key() is not None:
+                return expr.IntConst(0)
+    node = cls(*operands)
+    if all(isinstance(operand, expr.IntConst) for operand in operands):
+        try:
+            return expr.IntConst(
+                node._apply(*(operand.value for operand in operands)))
+        except ZeroDivisionError:
+            pass  # keep the node; let the fault surface at run time
+    return node
+
+
 # All the comparisons are similar, so we'll
 # choose the class based on the token
 COMPARISONS = { TokenCat.EQ: expr.EQ,  TokenCat.NE: expr.NE,
@@ -164,11 +239,12 @@ def _rel(stream: TokenStream) -> expr.Comparison:
     left = _expr(stream)
     op = stream.take()
     right = _expr(stream)
-    if op.kind in COMPARISONS:
-        clazz = COMPARISONS[op.kind]
-        return clazz(left, right)
-    else:
+    # Single dict probe; the membership test would hash the same
+    # key a second time
+    clazz = COMPARISONS.get(op.kind)
+    if clazz is None:
         raise InputError(f"Expecting comparison, saw '{op.value}' instead")
+    return _mk(clazz, left, right)
 
 
 def _expr(stream: TokenStream) -> expr.Expr:
@@ -178,16 +254,14 @@ def _expr(stream: TokenStream) -> expr.Expr:
     log.debug(f"parsing sum starting from token {stream.peek()}")
     left = _term(stream)
     log.debug(f"sum begins with {left}")
-    while stream.peek().value in ["+", "-"]:
+    while stream.peek().kind in _ADDOPS:
         op = stream.take()
         log.debug(f"expr addition op {op}")
         right = _term(stream)
-        if op.value == "+":
-            left = expr.Plus(left, right)
-        elif op.value == "-":
-            left = expr.Minus(left, right)
+        if op.kind is TokenCat.PLUS:
+            left = _mk(expr.Plus, left, right)
         else:
-            raise InputError(f"What's that op? {op}")
+            left = _mk(expr.Minus, left, right)
     return left
 
 
@@ -195,44 +269,61 @@ def _term(stream: TokenStream) -> expr.Expr:
     """term ::= primary { ('*'|'/')  primary }"""
     left = _primary(stream)
     log.debug(f"term starts with {left}")
-    while stream.peek().value in ["*", "/"]:
+    while stream.peek().kind in _MULOPS:
         op = stream.take()
         right = _primary(stream)
-        if op.value == "*":
-            left = expr.Times(left, right)
-        elif op.value == "/":
-            left = expr.Div(left, right)
+        if op.kind is TokenCat.TIMES:
+            left = _mk(expr.Times, left, right)
         else:
-            raise InputError(f"Expecting multiplicative op, got {op}")
+            left = _mk(expr.Div, left, right)
     return left
 
 
 def _primary(stream: TokenStream) -> expr.Expr:
     """Unary operations, Constants, Variables,
     input, and parenthesized expressions"""
-    log.debug(f"Parsing primary with starting token {stream.peek()}")
     token = stream.take()
-    if token.kind is TokenCat.INT:
-        log.debug(f"Returning IntConst node from token {token}")
-        return expr.IntConst(int(token.value))
-    elif token.kind is TokenCat.VAR:
-        log.debug(f"Variable {token.value}")
-        return expr.Var(token.value)
-    elif token.kind is TokenCat.READ:
-        log.debug("Read")
-        return expr.Read()
-    elif token.kind is TokenCat.ABS:
-        operand = _primary(stream)
-        return expr.Abs(operand)
-    elif token.kind is TokenCat.NEG:
-        operand = _primary(stream)
-        return expr.Neg(operand)
-    elif token.kind is TokenCat.LPAREN:
-        nested = _expr(stream)
-        require(stream, TokenCat.RPAREN, consume=True)
-        return nested
-    else:
+    handler = _PRIMARY_DISPATCH.get(token.kind)
+    if handler is None:
         raise InputError(f"Confused about {token} in expression")
+    return handler(stream, token)
+
+
+def _primary_int(stream: TokenStream, token) -> expr.Expr:
+    return expr.IntConst(int(token.value))
+
+
+def _primary_var(stream: TokenStream, token) -> expr.Expr:
+    return _var(token.value)
+
+
+def _primary_read(stream: TokenStream, token) -> expr.Expr:
+    return expr.Read()
+
+
+def _primary_abs(stream: TokenStream, token) -> expr.Expr:
+    return _mk(expr.Abs, _primary(stream))
+
+
+def _primary_neg(stream: TokenStream, token) -> expr.Expr:
+    return _mk(expr.Neg, _primary(stream))
+
+
+def _primary_paren(stream: TokenStream, token) -> expr.Expr:
+    nested = _expr(stream)
+    require(stream, TokenCat.RPAREN, consume=True)
+    return nested
+
+
+# The primary prediction table, keyed on the consumed token's kind
+_PRIMARY_DISPATCH = {
+    TokenCat.INT: _primary_int,
+    TokenCat.VAR: _primary_var,
+    TokenCat.READ: _primary_read,
+    TokenCat.ABS: _primary_abs,
+    TokenCat.NEG: _primary_neg,
+    TokenCat.LPAREN: _primary_paren,
+}
 
 ###
 # Calculator
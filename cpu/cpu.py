@@ -5,8 +5,11 @@ Eliza Black
 CIS 211 Spring Term 2022
 """
 
+import array
+
 import context  #  Python import search from project root
-from instruction_set.instr_format import Instruction, OpCode, CondFlag, decode
+from instruction_set.instr_format import Instruction, OpCode, CondFlag, \
+    decode, decode_fast, COND_HITS
 
 from cpu.memory import Memory
 from cpu.register import Register, ZeroRegister
@@ -28,35 +31,58 @@ class ALU(object):
     in parallel, but the Duck Machine has just one ALU in one core.
     """
     # The ALU chooses one operation to apply based on a provided
-    # operation code.  These are just simple functions of two arguments;
-    # in hardware we would use a multiplexer circuit to connect the
-    # inputs and output to the selected circuitry for each operation.
-    ALU_OPS = {
-        OpCode.ADD: lambda x, y: x + y,
-        OpCode.SUB: lambda x, y: x - y,
-        OpCode.MUL: lambda x, y: x * y,
-        OpCode.DIV: lambda x, y: x // y,
-        #
-        # For memory access operations load, store, the ALU
-        # performs the address calculation
-        OpCode.LOAD: lambda x, y: x + y,
-        OpCode.STORE: lambda x, y: x + y,
-        # Some operations perform no operation
-        OpCode.HALT: lambda x, y: 0
-    }
+    # operation code.  In hardware we would use a multiplexer circuit
+    # to connect the inputs and output to the selected circuitry for
+    # each operation; here that is a chain of identity tests on the
+    # opcode, each selecting a plain arithmetic expression.  A branch
+    # ladder beats the former dict of lambdas because the common case
+    # is one pointer comparison instead of a hash probe plus a
+    # Python-level lambda call per instruction.
 
     def exec(self, op: OpCode, in1: int, in2: int) -> tuple[int, CondFlag]:
-        try:
-            op_result = self.ALU_OPS[op](in1, in2)
-        except:
+        # LOAD and STORE use the ALU for their address calculation,
+        # so they share the adder with ADD
+        if op is OpCode.ADD or op is OpCode.LOAD or op is OpCode.STORE:
+            op_result = in1 + in2
+        elif op is OpCode.SUB:
+            op_result = in1 - in2
+        elif op is OpCode.MUL:
+            op_result = in1 * in2
+        elif op is OpCode.DIV:
+            if in2 == 0:
+                return (0, CondFlag.V)
+            op_result = in1 // in2
+        elif op is OpCode.HALT:
+            op_result = 0
+        else:
+            # Not an operation the ALU implements
             return (0, CondFlag.V)
+        if op_result == 0:
+            return (op_result, CondFlag.Z)
+        elif op_result < 0:
+            return (op_result, CondFlag.M)
         else:
-            if op_result == 0:
-                return (op_result, CondFlag.Z)
-            elif op_result < 0:
-                return (op_result, CondFlag.M)
-            elif op_result > 0:
-                return (op_result, CondFlag.P)
+            return (op_result, CondFlag.P)
+
+
+# Small-int opcode values cached at module level, so the dispatch
+# in step doesn't pay an enum attribute lookup per instruction.
+_OP_HALT = OpCode.HALT.value
+_OP_LOAD = OpCode.LOAD.value
+_OP_STORE = OpCode.STORE.value
+_OP_ADD = OpCode.ADD.value
+_OP_SUB = OpCode.SUB.value
+_OP_MUL = OpCode.MUL.value
+_OP_DIV = OpCode.DIV.value
+
+# Raw condition-code bits, for the same reason: the predicate check
+# and the condition-code update run once per executed instruction,
+# and a plain int AND beats Flag arithmetic there.
+_COND_M = CondFlag.M.value
+_COND_Z = CondFlag.Z.value
+_COND_P = CondFlag.P.value
+_COND_V = CondFlag.V.value
+_COND_ALWAYS = CondFlag.ALWAYS.value
 
 
 class CPUStep(MVCEvent):
@@ -82,80 +108,250 @@ class CPU(MVCListenable):
         super().__init__()
         self.memory = memory  # Not part of CPU; what we really have is a connection
 
+        # Register contents live in a flat int array, read and
+        # written by index in step.  The Register objects below are
+        # view facades, synchronized only when a listener is watching.
+        self.regs = array.array('q', [0] * 16)
         self.registers = [ZeroRegister(), Register(), Register(), Register(),
                           Register(), Register(), Register(), Register(),
                           Register(), Register(), Register(), Register(),
                           Register(), Register(), Register(), Register()]
-        self.condition = CondFlag.ALWAYS
+        # Condition codes as raw bits; the condition property below
+        # wraps them back into a CondFlag for display
+        self._condition_bits = _COND_ALWAYS
         self.halted = False
         self.alu = ALU()
         self.pc = self.registers[15]
 
+        # Flag mirror of the listener list, so the hot path tests a
+        # plain boolean instead of evaluating list truthiness
+        self._has_listeners = False
+
+        # Decoded-instruction cache: one slot per memory address,
+        # holding the word fetched from it and its fields unboxed to
+        # plain ints, so a loop decodes each instruction once and
+        # re-executes it from a single list index.  A STORE into a
+        # cached address clears the slot, which keeps self-modifying
+        # programs honest.
+        self._decode_cache: "list[tuple | None]" = [None] * memory.capacity
+
+    @property
+    def condition(self) -> CondFlag:
+        """The condition code register, as a CondFlag"""
+        return CondFlag(self._condition_bits)
+
+    @condition.setter
+    def condition(self, value: CondFlag) -> None:
+        self._condition_bits = value.value
+
+    def register_listener(self, listener) -> None:
+        super().register_listener(listener)
+        self._has_listeners = True
+
     # carries out one fetch/decode/execute cycle
     def step(self):
         """One fetch/decode/execute step"""
+        regs = self.regs
+
         # 1) Fetch an instruction
 
         # to fetch an instruction, first we get the address from
-        # register 15, using the get method of the Register class
-        instr_addr = self.pc.get()
-
-        # use the address to read the instruction word from
-        # memory, using the get method of the Memory class
-        instr_word = self.memory.get(instr_addr)
+        # register 15, the program counter
+        instr_addr = regs[15]
 
-        # 2) Decode
-        instr = decode(instr_word)
+        # 2) Fetch and decode, through the decode cache: after the
+        # first pass over a loop, both the memory read and the bit
+        # slicing are a single list index
+        cache = self._decode_cache
+        in_range = 0 <= instr_addr < len(cache)
+        hit = cache[instr_addr] if in_range else None
+        if hit is None:
+            # An out-of-range fetch reaches memory.get, which raises
+            # the SegFault
+            instr_word = self.memory.get(instr_addr)
+            # decode_fast hands back raw ints with no Instruction
+            # allocation; the full object is only built for display
+            hit = (instr_word,) + decode_fast(instr_word)
+            if in_range:
+                cache[instr_addr] = hit
+        instr_word, op, cond, reg_target, reg_src1, reg_src2, offset = hit
 
         # Display the CPU state when we have decoded the instruction,
-        # before we have executed it
-        self.notify_all(CPUStep(self, instr_addr, instr_word, instr))
+        # before we have executed it.  With no listener registered --
+        # the usual case for a headless run -- neither the CPUStep
+        # event nor the register facade sync is paid for at all.
+        if self._has_listeners:
+            for i in range(16):
+                self.registers[i].put(regs[i])
+            self.notify_all(CPUStep(self, instr_addr, instr_word,
+                                    decode(instr_word)))
 
         # 3) Execute
 
-        instr_predicate = self.condition & instr.cond  # check the instruction predicate
-        if instr_predicate:
-            left_op = self.registers[instr.reg_src1].get()
-            right_op = self.registers[instr.reg_src2].get() + instr.offset
-            result = self.alu.exec(instr.op, left_op, right_op)  # calculate a result value and new condition code
+        # Check the instruction predicate through the precomputed
+        # truth table
+        if COND_HITS[self._condition_bits][cond]:
+            left_op = regs[reg_src1]
+            right_op = regs[reg_src2] + offset
 
             # BEFORE we save the result value and instruction code,
             # we increment the program counter (register 15).
-            self.pc.put(self.pc.get() + 1)
-
-            # Then, after incrementing the program counter, we complete the operation.
-            if instr.op is OpCode.STORE:
-                addr = result[0]  # use the result of the calculation as a memory address
-
-                # save the value of the register specified by instr.reg_target to that location in memory
-                value = self.registers[instr.reg_target].get()
-                self.memory.put(addr, value)
-
-            elif instr.op is OpCode.LOAD:
-                addr = result[0]
-                # fetch the value of that location in memory:
-                location_val = self.memory.get(addr)
-                # storing it in the register specified by instr.reg_target
-                self.registers[instr.reg_target].put(location_val)
+            regs[15] = instr_addr + 1
 
-            elif instr.op is OpCode.HALT:
+            # Then, after incrementing the program counter, we complete
+            # the operation.  The arithmetic is inlined here rather
+            # than dispatched through a lambda table in the ALU; this
+            # is the hottest loop in the simulator, and a dict lookup
+            # plus a call per executed instruction adds up.
+            if op == _OP_ADD:
+                result = left_op + right_op
+            elif op == _OP_SUB:
+                result = left_op - right_op
+            elif op == _OP_MUL:
+                result = left_op * right_op
+            elif op == _OP_DIV:
+                if right_op == 0:
+                    # Same as the ALU's overflow path: store zero,
+                    # raise the V flag
+                    if reg_target != 0:
+                        regs[reg_target] = 0
+                    self._condition_bits = _COND_V
+                    return
+                result = left_op // right_op
+            elif op == _OP_STORE:
+                # use the address calculation as a memory address and
+                # save the value of the register specified by
+                # instr.reg_target to that location in memory
+                addr = left_op + right_op
+                self.memory.put(addr, regs[reg_target])
+                # The store may have overwritten an instruction we
+                # already decoded
+                if 0 <= addr < len(cache):
+                    cache[addr] = None
+                return
+            elif op == _OP_LOAD:
+                # fetch the value of that location in memory; the read
+                # happens even for a load to r0 because memory-mapped
+                # input has a side effect
+                location_val = self.memory.get(left_op + right_op)
+                if reg_target != 0:
+                    regs[reg_target] = location_val
+                return
+            elif op == _OP_HALT:
                 self.halted = True
+                return
+            else:
+                # Not a legal opcode (e.g. a corrupt object file);
+                # raise the same ValueError the enum decode did.
+                # Off the hot path: legal opcodes never get here.
+                raise ValueError(f"{op} is not a valid OpCode")
 
+            # For the arithmetic operations we store the result in the
+            # register specified by instr.reg_target and store the new
+            # condition code in the condition field of the CPU.
+            if reg_target != 0:
+                regs[reg_target] = result
+            if result == 0:
+                self._condition_bits = _COND_Z
+            elif result < 0:
+                self._condition_bits = _COND_M
             else:
-                # For the other operations (ADD, SUB, MUL, DIV) we store the
-                # result of the calculation in the register specified by instr.reg_target
-                # and store the new condition code in the condition field of the CPU.
-                self.registers[instr.reg_target].put(result[0])
-                self.condition = result[1]
+                self._condition_bits = _COND_P
         else:
-            self.pc.put(self.pc.get() + 1)
+            regs[15] = instr_addr + 1
 
     def run(self, from_addr=0,  single_step=False) -> None:
         self.halted = False
-        self.registers[15].put(from_addr)
-        step_count = 0
-        while not self.halted:
-            if single_step:
+        # Memory may have been reloaded since the last run
+        self._decode_cache = [None] * self.memory.capacity
+        self.regs[15] = from_addr
+        if single_step:
+            step_count = 0
+            while not self.halted:
                 input(f"Step {step_count}; press enter")
-            self.step()
-            step_count += 1
+                self.step()
+                step_count += 1
+            return
+        if self._has_listeners:
+            # A listener needs the per-step display events, so run
+            # through step(); hoist the bound method and drop the
+            # per-cycle single_step test from the loop
+            step = self.step
+            while not self.halted:
+                step()
+            return
+        self._run_kernel()
+
+    def _run_kernel(self) -> None:
+        """Free-running headless loop.  This is step() inlined with
+        every piece of CPU state hoisted into locals, so the cycle
+        pays no method call and no self.<attr> lookups -- the whole
+        simulation is one loop over plain ints and an int array.
+        Mutable state (condition bits, halt flag) is written back to
+        the object when the program halts.
+        """
+        regs = self.regs
+        memory_get = self.memory.get
+        memory_put = self.memory.put
+        cache = self._decode_cache
+        cache_len = len(cache)
+        cond_hits = COND_HITS
+        cond_bits = self._condition_bits
+        while True:
+            instr_addr = regs[15]
+            in_range = 0 <= instr_addr < cache_len
+            hit = cache[instr_addr] if in_range else None
+            if hit is None:
+                instr_word = memory_get(instr_addr)
+                hit = (instr_word,) + decode_fast(instr_word)
+                if in_range:
+                    cache[instr_addr] = hit
+            _instr_word, op, cond, reg_target, reg_src1, reg_src2, offset = hit
+
+            if cond_hits[cond_bits][cond]:
+                left_op = regs[reg_src1]
+                right_op = regs[reg_src2] + offset
+                regs[15] = instr_addr + 1
+                if op == _OP_ADD:
+                    result = left_op + right_op
+                elif op == _OP_SUB:
+                    result = left_op - right_op
+                elif op == _OP_MUL:
+                    result = left_op * right_op
+                elif op == _OP_DIV:
+                    if right_op == 0:
+                        if reg_target != 0:
+                            regs[reg_target] = 0
+                        cond_bits = _COND_V
+                        continue
+                    result = left_op // right_op
+                elif op == _OP_STORE:
+                    addr = left_op + right_op
+                    memory_put(addr, regs[reg_target])
+                    if 0 <= addr < cache_len:
+                        cache[addr] = None
+                    continue
+                elif op == _OP_LOAD:
+                    location_val = memory_get(left_op + right_op)
+                    if reg_target != 0:
+                        regs[reg_target] = location_val
+                    continue
+                elif op == _OP_HALT:
+                    break
+                else:
+                    # Write the state back before raising so the
+                    # machine object stays consistent
+                    self._condition_bits = cond_bits
+                    raise ValueError(f"{op} is not a valid OpCode")
+                if reg_target != 0:
+                    regs[reg_target] = result
+                if result == 0:
+                    cond_bits = _COND_Z
+                elif result < 0:
+                    cond_bits = _COND_M
+                else:
+                    cond_bits = _COND_P
+            else:
+                regs[15] = instr_addr + 1
+        self._condition_bits = cond_bits
+        self.halted = True
@@ -8,12 +8,15 @@ of the Duck Machine series of projects.)
 """
 
 import context
+from instruction_set.instr_format import OBJ_MAGIC
 from cpu.memory import Memory, MemoryMappedIO
 from cpu.cpu import CPU
 import cpu.view as view
 
 import argparse
 import io
+import mmap
+import struct
 
 import logging
 logging.basicConfig()
@@ -34,14 +37,31 @@ def cli() -> object:
     return args
 
 def load(file: io.IOBase, memory: Memory) -> None:
-    addr = 0
-    log.debug(f"Loading from address 0")
-    for line in file:
-        word = int(line)
-        log.debug(f"Instruction value {word}")
-        memory.put(addr, word)
-        log.debug(f"Loaded {word} from address {addr} ")
-        addr += 1
+    log.debug("Loading from address 0")
+    # Slurp the whole object file at once and store it with one
+    # slice assignment, rather than a memory.put call per line.  A
+    # real on-disk file is memory-mapped so the bytes come straight
+    # from the page cache; in-memory buffers (StringIO from the
+    # asmgo pipeline) just read.
+    data = None
+    try:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[:]
+    except (ValueError, OSError, io.UnsupportedOperation, AttributeError):
+        # Pipes, StringIO buffers, and empty files can't be mapped
+        pass
+    if data is None:
+        data = file.read()
+    if isinstance(data, (bytes, bytearray)) and data[:4] == OBJ_MAGIC:
+        # Binary object file: packed little-endian 32-bit words,
+        # unpacked in one C-level call with no per-word parse
+        words = struct.unpack(f"<{(len(data) - 4) // 4}I", data[4:])
+    else:
+        # Decimal text, one word per line; int() and split() accept
+        # bytes as well as str, so the mmap path needs no decode
+        words = list(map(int, data.split()))
+    memory.load_bulk(words)
+    log.debug("Loaded %d words", len(words))
 
 def duck_output(addr: int, value: int) -> None:
     print(f"Quack!: {value}")
@@ -68,7 +88,7 @@ def main(objfile: io.IOBase, display=False, single_step=False):
     if display:
         log.debug("Creating a cpu_display")
         cpu_display = view.MachineStateView(cpu, 1200, 800)
-    log.debug(f"Loading object file {objfile}")
+    log.debug("Loading object file %s", objfile)
     load(objfile, mem)
     log.debug(f"Loaded, running from start")
     cpu.run(single_step=single_step)
@@ -12,6 +12,11 @@ import logging
 logging.basicConfig()
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
+# Snapshot of the debug-enabled check: get and put run once per
+# simulated memory access, and even a disabled log.debug call costs
+# a call plus building its message.  Flip the logger to DEBUG before
+# import (or set this by hand) to trace accesses again.
+_DEBUG = log.isEnabledFor(logging.DEBUG)
 
 class SegFault(Exception):
     """Segmentation fault is actually an operating-system 
@@ -48,6 +53,14 @@ class Memory(MVCListenable):
         super().__init__()  # Make it listenable
         self.capacity = capacity
         self._mem = capacity * [ 0 ]
+        # Mirror of the listener list, same pattern as the CPU: the
+        # access methods skip building event objects entirely when
+        # nothing is watching
+        self._has_listeners = False
+
+    def register_listener(self, listener) -> None:
+        super().register_listener(listener)
+        self._has_listeners = True
 
     def _check_bounds(self, index):
         if index < 0 or index >= self.capacity:
@@ -55,17 +68,33 @@ class Memory(MVCListenable):
 
     def get(self, index: int) -> int:
         """Fetch a word from memory"""
-        log.debug("Fetching word at memory address {}".format(index))
+        if _DEBUG:
+            log.debug("Fetching word at memory address %d", index)
         self._check_bounds(index)
-        self.notify_all(MemoryRead(self,index,self._mem[index]))
+        if self._has_listeners:
+            self.notify_all(MemoryRead(self,index,self._mem[index]))
         return self._mem[index]
 
     def put(self, index: int, value: int) -> None:
         """Store a word into memory"""
         self._check_bounds(index)
-        log.debug("Storing value {} at memory address {}".format(value, index))
+        if _DEBUG:
+            log.debug("Storing value %d at memory address %d", value, index)
         self._mem[index] = value
-        self.notify_all(MemoryWrite(self,index,value))
+        if self._has_listeners:
+            self.notify_all(MemoryWrite(self,index,value))
+
+    def load_bulk(self, words: "list | tuple", start: int = 0) -> None:
+        """Store a block of words with a single slice assignment.
+        This is for the loader, which fills plain RAM from address 0
+        upward: one bounds check for the whole block instead of a
+        put() call per word, and no per-word write events.
+        """
+        end = start + len(words)
+        if start < 0 or end > self.capacity:
+            raise SegFault(f"Bulk load of {len(words)} words"
+                           f" at address {start} out of bounds")
+        self._mem[start:end] = words
 
 
 class MemoryMappedIO(Memory):
@@ -92,15 +121,17 @@ class MemoryMappedIO(Memory):
 
     def get(self, index: int) -> int:
         """Hook OR Fetch a word from memory"""
-        if index in self.hooks_read:
-            hook = self.hooks_read[index]
+        # Single dict probe: almost every access is plain RAM, and
+        # the membership test would hash the address a second time
+        hook = self.hooks_read.get(index)
+        if hook is not None:
             return hook(index)
         return super().get(index)
 
     def put(self, index: int, value: int) -> None:
         """Hook OR Store a word into memory"""
-        if index in self.hooks_write:
-            hook = self.hooks_write[index]
+        hook = self.hooks_write.get(index)
+        if hook is not None:
             hook(index, value)
             return
         super().put(index, value)
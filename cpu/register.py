@@ -1,11 +1,18 @@
 """
-A Duck Machine register holds a 32 bit integer. 
-The Zero register is special: It always holds 0. 
+A Duck Machine register holds a 32 bit integer.
+The Zero register is special: It always holds 0.
+
+These objects are display facades: the CPU keeps the live register
+contents in a flat int array and indexes it directly, with the r0
+hard-wiring done by gating writes on the register number.  Instances
+here exist so the graphical view has something to .get() from, and
+are synchronized only while a listener is attached.
 """
 
 
 class Register(object):
     """Holds a 32-bit integer"""
+    __slots__ = ("_value",)
 
     def __init__(self):
         self._value = 0
@@ -19,6 +26,8 @@ class Register(object):
 
 class ZeroRegister(Register):
     """A register whose value can never change"""
+    __slots__ = ()
+
     def put(self, value) -> None:
         pass
 
@@ -23,6 +23,7 @@ from instruction_set.bitfield import BitField
 # using a Python enum. For the condition codes, a special kind
 # of enum called a Flag is useful
 from enum import Enum, Flag
+import functools
 
 # The field bit positions (defining a BitField object for each field)
 reserved = BitField(31,31)
@@ -33,6 +34,17 @@ reg_src1_field = BitField(14, 17)
 reg_src2_field = BitField(10, 13)
 offset_field = BitField(0, 9)
 
+# Shift amounts and masks mirroring the BitField definitions above,
+# inlined into decode so the hot fetch/decode/execute path does plain
+# shifts and ANDs instead of six BitField method calls per word.
+_OP_SHIFT, _OP_MASK = 26, 0x1F
+_COND_SHIFT, _COND_MASK = 22, 0xF
+_TARGET_SHIFT, _TARGET_MASK = 18, 0xF
+_SRC1_SHIFT, _SRC1_MASK = 14, 0xF
+_SRC2_SHIFT, _SRC2_MASK = 10, 0xF
+_OFFSET_MASK = 0x3FF
+_OFFSET_SIGN = 0x200
+
 
 # Registers are numbered from 0 to 15, and have names
 # like r3, r15, etc.  Two special registers have additional
@@ -61,11 +73,27 @@ class OpCode(Enum):
     STORE = 2   # Transfer from register to memory
     # ALU operations
     ADD = 3     # Addition
+    # Value 4 is unused.  Closing the gap (SUB=4, MUL=5, DIV=6)
+    # would let opcode-indexed tables drop one empty slot, but every
+    # object file already on disk encodes these numbers -- an old
+    # SUB word would silently decode as MUL -- so the numbering is
+    # frozen as part of the object-file format.
     SUB = 5     # Subtraction
     MUL = 6     # Multiplication
     DIV = 7     # Integer division (like // in Python)
 
 
+# One past the largest opcode value: the length of any dense table
+# indexed by raw opcode int, e.g. a dispatch list in a simulator.
+OPCODE_MAX = max(opcode.value for opcode in OpCode) + 1
+
+
+# Object files are decimal text by default, one word per line.  The
+# binary variant is this magic tag followed by packed little-endian
+# 32-bit words; the loader tells the two apart by the first 4 bytes.
+OBJ_MAGIC = b"DUCK"
+
+
 # A Flag enumeration is an integer in which we treat each individual bit like a boolean variable.
 class CondFlag(Flag):
     """The condition mask in an instruction and the format
@@ -84,18 +112,34 @@ class CondFlag(Flag):
         If the exact combination has a name, we return that.
         Otherwise, we combine bits, e.g., ZP for non-negative.
         """
-        for i in CondFlag:
-            if i is self:
-                return i.name
-        # No exact alias; give name as sequence of bit names
-        bits = []
-        for i in CondFlag:
-            # The following test is designed to exclude
-            # the special combinations 'NEVER' and 'ALWAYS'
-            masked = self & i
-            if masked and masked is i:
-                bits.append(i.name)
-        return "".join(bits)
+        # Only 16 combinations exist, all precomputed below, so
+        # this is a single tuple index with no allocation
+        return _COND_STR[self.value]
+
+
+# String form of each of the 16 flag combinations, indexed by raw
+# value.  The aliases NEVER and ALWAYS keep their names; any other
+# combination is the names of its set bits in enum order.  Built
+# here directly rather than by iterating the enum inside __str__,
+# which also sidesteps the Python 3.11 change to Flag iteration
+# (aliases no longer appear when iterating, so the old loop spelled
+# ALWAYS out as MZPV).
+_COND_STR = tuple(
+    "NEVER" if bits == 0
+    else "ALWAYS" if bits == 15
+    else "".join(flag.name
+                 for flag in (CondFlag.M, CondFlag.Z, CondFlag.P, CondFlag.V)
+                 if bits & flag.value)
+    for bits in range(16))
+assert _COND_STR[(CondFlag.P | CondFlag.M).value] == "MP"
+
+# Predicate truth table: COND_HITS[condition_bits][instruction_cond]
+# is True when an instruction's condition mask matches the current
+# condition code.  All 256 combinations precomputed, so the check
+# the simulator runs on every instruction is a tuple index yielding
+# a bool instead of int arithmetic plus a truth test.
+COND_HITS = tuple(tuple(bool(cc_bits & cond_bits) for cond_bits in range(16))
+                  for cc_bits in range(16))
 
 
 # A complete DM2018S instruction word, in its decoded form.  In DM2018S
@@ -107,6 +151,9 @@ class Instruction(object):
     """An instruction is made up of several fields, which
     are represented here as object fields.
     """
+    # Fixed slots: a decoded instruction never grows attributes, and
+    # dropping the per-instance __dict__ shrinks each one substantially
+    __slots__ = ("op", "cond", "reg_target", "reg_src1", "reg_src2", "offset")
 
     def __init__(self, op: OpCode, cond: CondFlag,
                      reg_target: int, reg_src1: int,
@@ -134,33 +181,97 @@ class Instruction(object):
     def encode(self) -> int:
         """Encode instruction as 32-bit integer
         """
-        word = 0
-        word = instr_field.insert(self.op.value, word)
-        word = cond_field.insert(self.cond.value, word)
-        word = reg_target_field.insert(self.reg_target, word)
-        word = reg_src1_field.insert(self.reg_src1, word)
-        word = reg_src2_field.insert(self.reg_src2, word)
-        word = offset_field.insert(self.offset, word)
-        return word
+        return _encode(self.op.value, self.cond.value,
+                       self.reg_target, self.reg_src1,
+                       self.reg_src2, self.offset)
+
+
+@functools.lru_cache(maxsize=4096)
+def _encode(op: int, cond: int, reg_target: int,
+            reg_src1: int, reg_src2: int, offset: int) -> int:
+    """Pack raw field values into an instruction word: one OR
+    expression over the shift/mask constants instead of six chained
+    BitField.insert calls; masking the offset handles negative
+    values.  Cached, since assembly output repeats the same handful
+    of words (jumps, register moves) many times.
+    """
+    return ((op << _OP_SHIFT)
+            | (cond << _COND_SHIFT)
+            | (reg_target << _TARGET_SHIFT)
+            | (reg_src1 << _SRC1_SHIFT)
+            | (reg_src2 << _SRC2_SHIFT)
+            | (offset & _OFFSET_MASK))
 
 
 #  Interpret an integer (memory word) as an instruction.
 #  This is the decode part of the fetch/decode/execute cycle of the CPU.
 #
+
+# Decoded instructions cached by raw word: a loop executes the same
+# handful of words over and over, and each repeat becomes one dict
+# probe instead of re-slicing the fields.  Bounded so a pathological
+# word stream can't grow it without limit.
+_decode_cache: "dict[int, Instruction]" = {}
+_DECODE_CACHE_LIMIT = 4096
+
+# Enum members keyed by raw value: OpCode(x) / CondFlag(x) go
+# through the enum __call__ machinery (including _missing_ hooks),
+# which costs far more than a dict probe on the decode path.
+_OPCODE_BY_VALUE = {opcode.value: opcode for opcode in OpCode}
+_CONDFLAG_BY_VALUE = {bits: CondFlag(bits) for bits in range(16)}
+
+
 def decode(word: int) -> Instruction:
         """
         Decode a memory word (32 bit int) into a new Instruction
 
-        Use the BitField objects defined before (op_field, reg_target_field,
-        etc.) to extract each of the fields from word, construct a
-        single Instruction object from those fields, and return
-        the Instruction object
+        The field extraction is inlined shifts and masks (see the
+        constants beside the BitField definitions); only the offset
+        field is signed and needs a sign extension.
         """
-        op = OpCode(instr_field.extract_signed(word))
-        cond = CondFlag(cond_field.extract_signed(word))
-        reg_target = reg_target_field.extract_signed(word)
-        reg_src1 = reg_src1_field.extract_signed(word)
-        reg_src2 = reg_src2_field.extract_signed(word)
-        offset = offset_field.extract_signed(word)
-
-        return Instruction(OpCode(op), CondFlag(cond), reg_target, reg_src1, reg_src2, offset)
\ No newline at end of file
+        instr = _decode_cache.get(word)
+        if instr is not None:
+            return instr
+        op = (word >> _OP_SHIFT) & _OP_MASK
+        cond = (word >> _COND_SHIFT) & _COND_MASK
+        reg_target = (word >> _TARGET_SHIFT) & _TARGET_MASK
+        reg_src1 = (word >> _SRC1_SHIFT) & _SRC1_MASK
+        reg_src2 = (word >> _SRC2_SHIFT) & _SRC2_MASK
+        # Branchless sign extension: xor flips the sign bit, the
+        # subtraction puts it back with the sign propagated
+        offset = ((word & _OFFSET_MASK) ^ _OFFSET_SIGN) - _OFFSET_SIGN
+
+        opcode = _OPCODE_BY_VALUE.get(op)
+        if opcode is None:
+            # Not a legal opcode; let the enum raise its ValueError
+            opcode = OpCode(op)
+        instr = Instruction(opcode, _CONDFLAG_BY_VALUE[cond], reg_target, reg_src1, reg_src2, offset)
+        if len(_decode_cache) < _DECODE_CACHE_LIMIT:
+            _decode_cache[word] = instr
+        return instr
+
+
+_decode_fast_cache: "dict[int, tuple]" = {}
+
+
+def decode_fast(word: int) -> "tuple[int, int, int, int, int, int]":
+    """Decode a memory word to a plain tuple of raw ints
+    (op, cond, reg_target, reg_src1, reg_src2, offset), with no enum
+    wrapping and no Instruction allocation.  The simulator's dispatch
+    works on the integers directly; only display paths need the full
+    Instruction object from decode().
+    """
+    fields = _decode_fast_cache.get(word)
+    if fields is not None:
+        return fields
+    # Same branchless sign extension as decode above
+    offset = ((word & _OFFSET_MASK) ^ _OFFSET_SIGN) - _OFFSET_SIGN
+    fields = ((word >> _OP_SHIFT) & _OP_MASK,
+              (word >> _COND_SHIFT) & _COND_MASK,
+              (word >> _TARGET_SHIFT) & _TARGET_MASK,
+              (word >> _SRC1_SHIFT) & _SRC1_MASK,
+              (word >> _SRC2_SHIFT) & _SRC2_MASK,
+              offset)
+    if len(_decode_fast_cache) < _DECODE_CACHE_LIMIT:
+        _decode_fast_cache[word] = fields
+    return fields
\ No newline at end of file
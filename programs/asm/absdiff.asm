@@ -1,5 +1,5 @@
 # Lovingly crafted by the robots of CIS 211
-# 2022-05-08 21:18:10.500629 from programs/mal/absdiff.mal
+# 2026-08-28 17:43:15.664630 from programs/mal/absdiff.mal
 #
    LOAD  r14,r0,r0[510]
    STORE  r14,var_x
@@ -9,12 +9,9 @@
     LOAD r13,var_y
    SUB  r14,r14,r13
     SUB  r0,r14,r0  # <Abs>
-    JUMP/PZ stay_positive_1
-    SUB r14,r0,r14  # Flip the sign
-stay_positive_1:   # </Abs>
+    SUB/M r14,r0,r14  # Flip the sign if negative
    STORE  r14,var_absdiff
-    LOAD r14,var_absdiff
-	SUB  r14,r0,r14  # Flip the sign
+    SUB  r14,r0,r14  # Flip the sign
    STORE  r14,var_neg
     LOAD r14,var_absdiff
    STORE  r14,r0,r0[511]
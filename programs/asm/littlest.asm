@@ -0,0 +1,7 @@
+# Lovingly crafted by the robots of CIS 211
+# 2026-08-28 17:43:15.672198 from programs/mal/littlest.mal
+#
+    ADD  r14,r0,r0[7]
+   STORE  r14,var_x
+	HALT  r0,r0,r0
+var_x:  DATA 0
@@ -1,5 +1,5 @@
 # Lovingly crafted by the robots of CIS 211
-# 2022-05-08 21:18:10.768915 from programs/mal/read_add_print.mal
+# 2026-08-28 17:43:15.676120 from programs/mal/read_add_print.mal
 #
    LOAD  r14,r0,r0[510]
    STORE  r14,var_x
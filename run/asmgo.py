@@ -11,6 +11,7 @@ import cpu.duck_machine as machine
 
 import sys
 import argparse
+import hashlib
 import os.path
 
 def cli():
@@ -23,30 +24,57 @@ def cli():
                         action="store_true")
     parser.add_argument("-s", "--step", help="Single step mode",
                         action="store_true")
+    parser.add_argument("--debug", help="Write intermediate .dasm file for inspection",
+                        action="store_true")
+    parser.add_argument("-b", "--binary", help="Use packed binary object files",
+                        action="store_true")
     args = parser.parse_args()
     return args
 
-def main(source: io.IOBase, display=False, step=False):
-    # Create and use temporary files in ../programs/tmp
+def main(source: io.IOBase, display=False, step=False, debug=False,
+         binary=False):
+    # The object-file cache lives in ../programs/tmp
     this_dir = os.path.abspath(os.path.join(os.path.dirname(__file__)))
     tmp_dir = os.path.abspath(os.path.join(this_dir, "../programs/tmp"))
-    # Assembler phase 1
-    dasm_path = os.path.join(tmp_dir, "tmp.dasm")
-    dasm = open(dasm_path, "w")
-    asm1.main(source, dasm)
-    dasm.close()
-    # Assembler phase 2
-    obj_path = os.path.join(tmp_dir, "tmp.obj")
-    dasm = open(dasm_path, "r")
-    obj = open(obj_path, "w")
-    asm2.main(dasm, obj)
+    # Read the source once and key the cached object file on a hash
+    # of its content: re-running an unchanged program finds it
+    # already assembled and skips both assembler phases.
+    text = source.read()
+    digest = hashlib.sha1(text.encode()).hexdigest()[:16]
+    # Binary and text object files cache under different suffixes;
+    # the loader sniffs the format, so both open as bytes
+    obj_path = os.path.join(tmp_dir, digest + (".objb" if binary else ".obj"))
+    if os.path.exists(obj_path):
+        obj = open(obj_path, "rb")
+        machine.main(obj, display=display, single_step=step)
+        return
+    # Pipe phase 1 into phase 2 through in-memory buffers; nothing
+    # touches the disk except the cached object file (and the .dasm
+    # intermediate, if --debug asked to keep it for inspection)
+    dasm_buf = io.StringIO()
+    asm1.main(io.StringIO(text), dasm_buf)
+    dasm_buf.seek(0)
+    obj_buf = io.BytesIO() if binary else io.StringIO()
+    asm2.main(dasm_buf, obj_buf, binary=binary)
+    if debug:
+        dasm_path = os.path.join(tmp_dir, f"{digest}.dasm")
+        dasm = open(dasm_path, "w")
+        dasm.write(dasm_buf.getvalue())
+        dasm.close()
+    # Cache under a scratch name and rename into place on success,
+    # so a failure can't leave a partial file that would satisfy the
+    # cache check on the next run.
+    obj = open(obj_path + ".part", "wb" if binary else "w")
+    obj.write(obj_buf.getvalue())
     obj.close()
-    # Execute in simulator
-    obj = open(obj_path, "r")
-    machine.main(obj, display=display, single_step=step)
+    os.replace(obj_path + ".part", obj_path)
+    # Execute in simulator, straight from the in-memory object code
+    obj_buf.seek(0)
+    machine.main(obj_buf, display=display, single_step=step)
 
 
 if __name__ == "__main__":
     args = cli()
-    main(args.sourcefile, display=args.display, step=args.step)
+    main(args.sourcefile, display=args.display, step=args.step,
+         debug=args.debug, binary=args.binary)
 
@@ -1,5 +1,6 @@
 """Unit tests for assembler phase 1"""
 
+import functools
 import unittest
 from asm.assembler_phase1 import *
 
@@ -45,12 +46,16 @@ class TestParseMemop(unittest.TestCase):
         self.assertEqual(fields["label"], "bogon")
 
 
+@functools.lru_cache(maxsize=1024)
 def squish(s: str) -> str:
     """Discard initial and final spaces and compress
     all other runs of whitespace to a single space,
+    (Cached: the comparison loops below squish the same
+    source and expected lines over and over.  No-argument
+    split already drops leading and trailing whitespace,
+    so there is no separate strip.)
     """
-    parts = s.strip().split()
-    return " ".join(parts)
+    return " ".join(s.split())
 
 class TestOptionalFieldsFixup(unittest.TestCase):
 
@@ -73,55 +78,62 @@ class TestOptionalFieldsFixup(unittest.TestCase):
 
 
 class TestTransformation(unittest.TestCase):
+    # Case fixtures split once at class-definition time rather than
+    # re-tokenized inside each test body on every run.  transform()
+    # does not mutate its input, so sharing the lists is safe.
 
-    def test_memop_no_optional(self):
-        lines = """
+    MEMOP_LINES = """
         # A comment line
-        at_zero: ADD r0,r0,r0 
+        at_zero: ADD r0,r0,r0
         LOAD  r5,later
         STORE r5,at_zero
         ADD  r5,r0,r0[42]
         HALT r0,r0,r0
         later: DATA 84
         """.split("\n")
-        transformed = transform(lines)
-        expected = """
+    MEMOP_EXPECTED = """
         # A comment line
-        at_zero: ADD r0,r0,r0 
+        at_zero: ADD r0,r0,r0
         LOAD  r5,r0,r15[4] #later
         STORE r5,r0,r15[-2] #at_zero
         ADD  r5,r0,r0[42]
         HALT r0,r0,r0
         later: DATA 84
         """.split("\n")
-        self.assertEqual(len(transformed), len(expected))
-        for i in range(len(expected)):
-            self.assertEqual(squish(transformed[i]), squish(expected[i]))
 
-    def test_memop_preserve_optionals(self):
-        lines = """
+    PRESERVE_LINES = """
         # Just a comment
-        zero: # With a comment 
+        zero: # With a comment
 
         # Blank line above should appear in output
         still_zero:  ADD  r5,more      # Another comment
-        now_one:     LOAD r5,zero      # Why not? 
+        now_one:     LOAD r5,zero      # Why not?
         now_two:     STORE/M r5,somewhere # Silly but it's just a test
         somewhere:   HALT r0,r0,r0  # We would clobber this instruction!
         more:        DATA 17
         """.split("\n")
-        transformed = transform(lines)
-        expected = """
+    PRESERVE_EXPECTED = """
         # Just a comment
-        zero: # With a comment 
+        zero: # With a comment
 
         # Blank line above should appear in output
         still_zero:  ADD  r5,r0,r15[4] #more # Another comment
-        now_one:     LOAD r5,r0,r15[-1] #zero # Why not? 
+        now_one:     LOAD r5,r0,r15[-1] #zero # Why not?
         now_two:     STORE/M r5,r0,r15[1] #somewhere # Silly but it's just a test
         somewhere:   HALT r0,r0,r0  # We would clobber this instruction!
         more:        DATA 17
         """.split("\n")
+
+    def test_memop_no_optional(self):
+        transformed = transform(self.MEMOP_LINES)
+        expected = self.MEMOP_EXPECTED
+        self.assertEqual(len(transformed), len(expected))
+        for i in range(len(expected)):
+            self.assertEqual(squish(transformed[i]), squish(expected[i]))
+
+    def test_memop_preserve_optionals(self):
+        transformed = transform(self.PRESERVE_LINES)
+        expected = self.PRESERVE_EXPECTED
         self.assertEqual(len(transformed), len(expected))
         for i in range(len(expected)):
             self.assertEqual(squish(transformed[i]), squish(expected[i]))
@@ -8,18 +8,21 @@ cases here just catch some bugs in the pieces as we
 build up the full code generator.
 """
 
+import re
 import unittest
 from compiler.expr import *
 from compiler.codegen_context import Context
 from typing import List, Union
 
+# Runs of whitespace, collapsed in one C-level regex pass per line
+_WS_RE = re.compile(r"\s+")
+
 
 def squish(s: str) -> str:
     """Discard initial and final spaces and compress
     all other runs of whitespace to a single space,
     """
-    parts = s.strip().split()
-    return " ".join(parts)
+    return _WS_RE.sub(" ", s).strip()
 
 def crush(text: Union[str, List[str]]) -> List[str]:
     """Whether given a single multi-line string or a
@@ -29,23 +32,41 @@ def crush(text: Union[str, List[str]]) -> List[str]:
     # If it's a single multi-line string, break
     # it into lines
     if isinstance(text, str):
-        lines = text.split("\n")
+        lines = text.splitlines()
     else:
         # If it's not a string, it better be a list of strings
         assert isinstance(text, list)
         lines = text
-    squished = [squish(l) for l in lines]
-    crushed = [l for l in squished if len(l) > 0]
-    return crushed
+    # Squish and drop empty lines in a single pass
+    return [line for line in (_WS_RE.sub(" ", l).strip() for l in lines)
+            if line]
 
 class AsmTestCase(unittest.TestCase):
+    # Expected-output strings are literals reused across runs, so
+    # their crushed forms are cached by the raw string
+    _crushed_expected: dict = {}
+
+    # Constant expected outputs a test class declares up front,
+    # keyed by case name; crushed once per class in setUpClass
+    EXPECTED: dict = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls._CRUSHED = {key: crush(text)
+                        for key, text in cls.EXPECTED.items()}
+
+    def codeEqualKey(self, generated: List[str], key: str) -> bool:
+        """Like codeEqual, against the class fixture named key."""
+        self.assertEqual(crush(generated), self._CRUSHED[key])
 
     def codeEqual(self, generated: List[str], expected: str) -> bool:
         gen = crush(generated)
-        exp = crush(expected)
-        self.assertEqual(len(gen), len(exp))
-        for i in range(len(gen)):
-            self.assertEqual(gen[i], exp[i])
+        exp = self._crushed_expected.get(expected)
+        if exp is None:
+            exp = self._crushed_expected[expected] = crush(expected)
+        # One list comparison; on mismatch unittest renders a
+        # per-line diff anyway, which covers the length check too
+        self.assertEqual(gen, exp)
 
 
 class Test_IntConst_Gen(AsmTestCase):
@@ -219,220 +240,112 @@ class Test_Unops_Gen(AsmTestCase):
         expected = """
         LOAD r14,const_n_3
         SUB  r0,r14,r0  # <Abs>
-        JUMP/PZ already_positive_1
-        SUB r14,r0,r14  # Flip the sign
-        already_positive_1:   # </Abs>
+        SUB/M r14,r0,r14  # Flip the sign if negative
         const_n_3:  DATA -3
         """
         generated = context.get_lines()
         self.codeEqual(generated, expected)
 
 
-class Test_Condjump(AsmTestCase):
+class Test_Peephole(AsmTestCase):
+    """Redundant-load elimination, opt-in via peephole_enabled"""
 
-    def test_EQ_iftrue(self):
-        """==, jump if true"""
+    def test_reload_becomes_copy(self):
+        """The second load of x is satisfied by a register copy"""
         context = Context()
+        context.peephole_enabled = True
         target = context.allocate_register()
-        e = EQ(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_true")
+        e = Plus(Var("x"), Var("x"))
+        e.gen(context, target)
         expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/Z  here_if_true #==
-        const_3: DATA 3
-        const_5: DATA 5
+        LOAD r14,var_x
+        ADD  r13,r0,r14  # reuse var_x
+        ADD r14,r14,r13
+        var_x: DATA 0
         """
         generated = context.get_lines()
         self.codeEqual(generated, expected)
 
-    def test_EQ_iffalse(self):
-        """==, jump if false"""
-        context = Context()
-        target = context.allocate_register()
-        e = EQ(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_false", jump_cond=False)
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/PM  here_if_false #==
-        const_3: DATA 3
-        const_5: DATA 5
+    def test_store_forwards(self):
+        """After a STORE the register still holds the variable,
+        so the following load disappears entirely.
         """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
-
-    def test_NE_iftrue(self):
-        """!=, jump if true"""
         context = Context()
+        context.peephole_enabled = True
         target = context.allocate_register()
-        e = NE(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_true")
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/PM  here_if_true #!=
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
-
-    def test_NE_iffalse(self):
-        """!=, jump if false"""
-        context = Context()
-        target = context.allocate_register()
-        e = NE(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_false", jump_cond=False)
+        e = Seq(Assign(Var("x"), IntConst(3)),
+                Plus(Var("x"), IntConst(4)))
+        e.gen(context, target)
         expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/Z  here_if_false #!=
+        LOAD r14,const_3
+        STORE r14,var_x
+        LOAD r13,const_4
+        ADD r14,r14,r13
         const_3: DATA 3
-        const_5: DATA 5
+        const_4: DATA 4
+        var_x: DATA 0
         """
         generated = context.get_lines()
         self.codeEqual(generated, expected)
 
-    def test_GT_iftrue(self):
-        """>, jump if true"""
-        context = Context()
-        target = context.allocate_register()
-        e = GT(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_true")
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/P  here_if_true #>
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
 
-    def test_GT_iffalse(self):
-        """>, jump if false"""
-        context = Context()
-        target = context.allocate_register()
-        e = GT(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_false", jump_cond=False)
-        expected = """
+class Test_Condjump(AsmTestCase):
+    # The twelve cases share one code shape; only the comparison
+    # class, the jump sense, and the condition code on the JUMP
+    # vary.  Both the fixture strings and the test methods are
+    # generated from this table (see the loop below the class).
+    CASES = [
+        (EQ, True, "Z", "=="),
+        (EQ, False, "PM", "=="),
+        (NE, True, "PM", "!="),
+        (NE, False, "Z", "!="),
+        (GT, True, "P", ">"),
+        (GT, False, "ZM", ">"),
+        (GE, True, "PZ", ">="),
+        (GE, False, "M", ">="),
+        (LT, True, "M", "<"),
+        (LT, False, "PZ", "<"),
+        (LE, True, "ZM", "<="),
+        (LE, False, "P", "<="),
+    ]
+
+    EXPECTED = {
+        f"{op.__name__}_if{'true' if jump_cond else 'false'}": f"""
         LOAD  r14,const_3
         LOAD  r13,const_5
         SUB   r0,r14,r13
-        JUMP/ZM  here_if_false #>
+        JUMP/{cc}  here_if_{'true' if jump_cond else 'false'} #{sym}
         const_3: DATA 3
         const_5: DATA 5
         """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
+        for op, jump_cond, cc, sym in CASES
+    }
 
-    def test_GE_iftrue(self):
-        """>=, jump if true"""
-        context = Context()
-        target = context.allocate_register()
-        e = GE(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_true")
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/PZ  here_if_true #>=
-        const_3: DATA 3
-        const_5: DATA 5
+    def _check_condjump(self, op_class, key, jump_cond=True):
+        """Generate op_class(3, 5).condjump and compare against
+        the class fixture named key.
         """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
-
-    def test_GE_iffalse(self):
-        """>=, jump if false"""
         context = Context()
         target = context.allocate_register()
-        e = GE(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_false", jump_cond=False)
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/M  here_if_false #>=
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
+        e = op_class(IntConst(3), IntConst(5))
+        label = "here_if_true" if jump_cond else "here_if_false"
+        e.condjump(context, target, label, jump_cond=jump_cond)
+        self.codeEqualKey(context.get_lines(), key)
 
-    def test_LT_iftrue(self):
-        """<, jump if true"""
-        context = Context()
-        target = context.allocate_register()
-        e = LT(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_true")
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/M  here_if_true #<
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
 
-    def test_LT_iffalse(self):
-        """>=, jump if false"""
-        context = Context()
-        target = context.allocate_register()
-        e = LT(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_false", jump_cond=False)
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/PZ  here_if_false #<
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
+def _make_condjump_test(op_class, key, jump_cond, sym):
+    """Build one test method for the case table above"""
+    def test(self):
+        self._check_condjump(op_class, key, jump_cond=jump_cond)
+    test.__name__ = f"test_{key}"
+    test.__doc__ = f"{sym}, jump if {'true' if jump_cond else 'false'}"
+    return test
 
-    def test_LE_iftrue(self):
-        """<=, jump if true"""
-        context = Context()
-        target = context.allocate_register()
-        e = LE(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_true")
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/ZM  here_if_true #<=
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
 
-    def test_LE_iffalse(self):
-        """>=, jump if false"""
-        context = Context()
-        target = context.allocate_register()
-        e = LE(IntConst(3), IntConst(5))
-        e.condjump(context, target, "here_if_false", jump_cond=False)
-        expected = """
-        LOAD  r14,const_3
-        LOAD  r13,const_5
-        SUB   r0,r14,r13
-        JUMP/P  here_if_false #<=
-        const_3: DATA 3
-        const_5: DATA 5
-        """
-        generated = context.get_lines()
-        self.codeEqual(generated, expected)
+for _op, _jump, _cc, _sym in Test_Condjump.CASES:
+    _key = f"{_op.__name__}_if{'true' if _jump else 'false'}"
+    setattr(Test_Condjump, f"test_{_key}",
+            _make_condjump_test(_op, _key, _jump, _sym))
 
 
 class Test_While_Gen(AsmTestCase):
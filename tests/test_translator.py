@@ -1,14 +1,26 @@
 """Test a translator (file-to-file transformation)
 across a set of source and expected product files.
 
+The usual pairing is the Mallard compiler: sources from
+programs/mal against expectations in programs/asm, which are
+generated by the current compiler with its optimizations on.
+(programs/dasm holds assembler phase-1 output, not compiler
+output, so it is not a target for this checker.)
 """
-import subprocess
+import contextlib
+import io
 import pathlib
 import argparse
 import subprocess
+import sys
+
+import context
+from compiler import compile as translator
 
-# The filter we will be testing
-COMMAND = "python3 compiler/compile.py "
+# The subprocess form of the filter, kept as an --isolated fallback.
+# The normal path calls translator.main in this process: interpreter
+# start-up dwarfs the compile time of a small Mallard program.
+COMMAND = [sys.executable, "compiler/compile.py"]
 
 def cli() -> object:
     """Command line interface"""
@@ -19,4 +31,58 @@ def cli() -> object:
     parser.add_argument("expectations",
                         help="Directory of expected outputs",
                         type=str)
-    
\ No newline at end of file
+    parser.add_argument("--isolated", action="store_true",
+                        help="Translate in a fresh subprocess per file")
+    return parser.parse_args()
+
+def significant(lines: "list[str]") -> "list[str]":
+    """Output lines that should match: comments (including the
+    timestamped header) and blank lines are not significant, and
+    neither is the exact spacing within a line.
+    """
+    kept = []
+    for line in lines:
+        line = " ".join(line.split())
+        if line and not line.startswith("#"):
+            kept.append(line)
+    return kept
+
+def translate(source: pathlib.Path) -> "list[str]":
+    """Translate one source file in this process"""
+    buf = io.StringIO()
+    with open(source) as src:
+        # The compiler prints a progress note; keep it out of the
+        # PASS/FAIL report
+        with contextlib.redirect_stdout(io.StringIO()):
+            translator.main(src, buf)
+    return buf.getvalue().splitlines()
+
+def translate_isolated(source: pathlib.Path) -> "list[str]":
+    """Translate one source file in a fresh interpreter"""
+    proc = subprocess.run(COMMAND + [str(source)],
+                          capture_output=True, text=True)
+    return proc.stdout.splitlines()
+
+def main():
+    args = cli()
+    exp_dir = pathlib.Path(args.expectations)
+    expected_by_stem = {p.stem: p for p in exp_dir.iterdir() if p.is_file()}
+    failures = 0
+    for source in sorted(pathlib.Path(args.sources).iterdir()):
+        expected = expected_by_stem.get(source.stem)
+        if expected is None:
+            continue
+        if args.isolated:
+            produced = translate_isolated(source)
+        else:
+            produced = translate(source)
+        if significant(produced) == significant(
+                expected.read_text().splitlines()):
+            print(f"PASS {source.name}")
+        else:
+            print(f"FAIL {source.name}")
+            failures += 1
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()